@@ -0,0 +1,96 @@
+import numpy as np
+
+def _clog2(val):
+    return int(np.ceil(np.log2(val)))
+
+class Model:
+    """
+    model of BWP_extractor
+
+    Works on whole symbols of FFT_demod output with shape (num_symbols, FFT_LEN) and their m_axis_out_tuser
+    {SFN, subframe, symbol, blk_exp}. The subcarrier masks are computed once per symbol type, a symbol is a PBCH
+    symbol if it is symbol 3, 4 or 5 of subframe 0 and an SSS symbol if it is symbol 4 of subframe 0.
+    Like in the HDL, the PBCH mask of symbol 4 covers all PBCH_LEN subcarriers, including the SSS.
+
+    PBCH_valid_o and SSS_valid_o are not gated with s_axis_in_tvalid in the HDL, so a testbench that samples them
+    every clock cycle sees a subcarrier twice if the input stalls. The model gives every subcarrier once.
+    """
+    SFN_MAX = 1023
+    SUBFRAMES_PER_FRAME = 20
+    SYM_PER_SF = 14
+    SYMBOLS_PER_PRB = 12
+    SSS_LEN = 127
+    PBCH_SYMBOLS = [3, 4, 5]
+    SSS_SYMBOL = 4
+    NUM_PRB = {8 : 20, 9 : 25, 10 : 52, 11 : 106}
+
+    # symbol types, index of the first axis of the masks
+    TYPE_DATA = 0
+    TYPE_PBCH = 1
+    TYPE_SSS = 3  # SSS symbols are PBCH symbols as well
+
+    def __init__(self, IN_DW, NFFT, BLK_EXP_LEN = 8):
+        self.IN_DW = int(IN_DW)
+        self.NFFT = int(NFFT)
+        self.BLK_EXP_LEN = int(BLK_EXP_LEN)
+        assert self.NFFT in self.NUM_PRB, f'NFFT = {self.NFFT} is not supported!'
+        self.FFT_LEN = 2 ** self.NFFT
+        self.SFN_WIDTH = _clog2(self.SFN_MAX)
+        self.SUBFRAME_NUMBER_WIDTH = _clog2(self.SUBFRAMES_PER_FRAME - 1)
+        self.SYMBOL_NUMBER_WIDTH = _clog2(self.SYM_PER_SF - 1)
+        self.USER_WIDTH_IN = self.SFN_WIDTH + self.SUBFRAME_NUMBER_WIDTH + self.SYMBOL_NUMBER_WIDTH + self.BLK_EXP_LEN
+        self.USER_WIDTH_OUT = self.USER_WIDTH_IN + 1
+        self.SSS_START = self.FFT_LEN // 2 - (self.SSS_LEN + 1) // 2
+        self.PBCH_LEN = 20 * self.SYMBOLS_PER_PRB
+        self.PBCH_START = self.FFT_LEN // 2 - self.PBCH_LEN // 2
+        self.BWP_LEN = self.NUM_PRB[self.NFFT] * self.SYMBOLS_PER_PRB
+        self.SC_START = self.FFT_LEN // 2 - self.BWP_LEN // 2
+        self.SC_END = self.SC_START + self.BWP_LEN
+
+        sc = np.arange(self.FFT_LEN)
+        self.BWP_mask = (sc >= self.SC_START) & (sc < self.SC_END)
+        PBCH_SC = (sc >= self.PBCH_START) & (sc < self.PBCH_START + self.PBCH_LEN)
+        SSS_SC = (sc >= self.SSS_START) & (sc < self.SSS_START + self.SSS_LEN)
+        # masks[symbol type] of PBCH_valid_o and SSS_valid_o
+        self.PBCH_masks = np.zeros((4, self.FFT_LEN), bool)
+        self.PBCH_masks[[self.TYPE_PBCH, self.TYPE_SSS]] = PBCH_SC
+        self.SSS_masks = np.zeros((4, self.FFT_LEN), bool)
+        self.SSS_masks[self.TYPE_SSS] = SSS_SC
+        for masks in (self.BWP_mask, self.PBCH_masks, self.SSS_masks):
+            masks.setflags(write = False)
+
+    def symbol_type(self, tuser):
+        """symbol type of every symbol for s_axis_in_tuser"""
+        tuser = np.asarray(tuser, np.int64) >> self.BLK_EXP_LEN
+        sym = tuser & (2 ** self.SYMBOL_NUMBER_WIDTH - 1)
+        subframe = (tuser >> self.SYMBOL_NUMBER_WIDTH) & (2 ** self.SUBFRAME_NUMBER_WIDTH - 1)
+        is_PBCH = np.isin(sym, self.PBCH_SYMBOLS) & (subframe == 0)
+        is_SSS = (sym == self.SSS_SYMBOL) & (subframe == 0)
+        return is_PBCH * self.TYPE_PBCH + is_SSS * (self.TYPE_SSS - self.TYPE_PBCH)
+
+    def process(self, data, tuser):
+        """
+        returns m_axis_out_tdata with shape (num_symbols, BWP_LEN), m_axis_out_tuser per symbol and tlast per subcarrier
+
+        data are symbols of s_axis_in_tdata with shape (num_symbols, FFT_LEN) in any dtype, tuser is s_axis_in_tuser
+        per symbol. tlast is the same for every symbol, it is set on the last subcarrier of the BWP.
+        """
+        data = np.atleast_2d(data)
+        tuser = np.broadcast_to(np.asarray(tuser, np.int64), (len(data),))
+        is_PBCH = (self.symbol_type(tuser) & self.TYPE_PBCH) != 0
+        tlast = np.zeros(self.BWP_LEN, bool)
+        tlast[-1] = True
+        return data[:, self.SC_START:self.SC_END], (tuser << 1) + is_PBCH, tlast
+
+    def PBCH(self, data, tuser):
+        """subcarriers with PBCH_valid_o of all symbols in output order"""
+        return self._select(data, tuser, self.PBCH_masks)
+
+    def SSS(self, data, tuser):
+        """subcarriers with SSS_valid_o of all symbols in output order"""
+        return self._select(data, tuser, self.SSS_masks)
+
+    def _select(self, data, tuser, masks):
+        data = np.atleast_2d(data)
+        symbol_type = np.broadcast_to(self.symbol_type(tuser), (len(data),))
+        return data[masks[symbol_type]]
@@ -0,0 +1,80 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+atan2 = load_model('atan2')
+complex_multiplier = load_model('complex_multiplier')
+
+class Model:
+    """
+    model of CFO_calc
+
+    C0 and C1 are scaled up by the same power of two until the highest used bit of all four components is at
+    position C_DW / 2 - 2, then C0 * conj(C1) is computed with ATAN_IN_DW bits per component and fed into atan2.
+    """
+    def __init__(self, C_DW, CFO_DW, DDS_DW, ATAN_IN_DW = 8):
+        self.C_DW = int(C_DW)
+        self.CFO_DW = int(CFO_DW)
+        self.DDS_DW = int(DDS_DW)
+        self.ATAN_IN_DW = int(ATAN_IN_DW)
+        self.multiplier = complex_multiplier.Model(self.C_DW // 2, self.C_DW // 2, self.ATAN_IN_DW)
+        self.atan2 = atan2.Model(self.ATAN_IN_DW, self.ATAN_IN_DW, self.CFO_DW)
+        self.dtype = np.int64 if self.C_DW <= 60 else object
+
+    def calc(self, C0, C1):
+        """
+        returns CFO_angle_o and CFO_DDS_inc_o for every pair of C0_i and C1_i
+
+        C0 and C1 can be complex integers like the output of PSS_correlator_mr.Model.correlate()
+        or packed {im, re} words like C0_o and C1_o.
+        """
+        C0_re, C0_im = self._unpack(C0)
+        C1_re, C1_im = self._unpack(C1)
+
+        shift = self.input_shift(C0_re, C0_im, C1_re, C1_im)
+        half = self.C_DW // 2
+        C0_re, C0_im, C1_re, C1_im = (self._wrap(val << shift, half) for val in (C0_re, C0_im, C1_re, C1_im))
+        C1_im = self._wrap(-C1_im, half)
+
+        prod_re, prod_im = self.multiplier.multiply(C0_re, C0_im, C1_re, C1_im)
+        angle = self.atan2.angle(prod_im, prod_re)
+
+        # >>> 7 for divide / 64 / 2, then take the upper DDS_DW bits
+        DDS_inc = angle >> 7
+        if self.CFO_DW >= self.DDS_DW:
+            DDS_inc = DDS_inc >> (self.CFO_DW - self.DDS_DW)
+        return angle, DDS_inc
+
+    def input_shift(self, C0_re, C0_im, C1_re, C1_im):
+        """number of bits by which INPUT_SCALING shifts C0 and C1 to the left"""
+        half = self.C_DW // 2
+        # a bit of a negative number is used if it is 0
+        used = np.zeros(len(C0_re), self.dtype)
+        for val in (C0_re, C0_im, C1_re, C1_im):
+            used |= np.where(val < 0, ~val, val)
+        max_used_MSB = np.zeros(len(C0_re), self.dtype)
+        for pos in range(1, half - 1):
+            max_used_MSB = np.where((used >> pos) & 1, pos, max_used_MSB)
+        return (half - 2 - max_used_MSB).astype(self.dtype)
+
+    def _unpack(self, C):
+        half = self.C_DW // 2
+        C = np.asarray(C) if isinstance(C, np.ndarray) else np.asarray(C, dtype = object)
+        if np.iscomplexobj(C) or (len(C) and isinstance(C.flat[0], complex)):
+            C = C.astype(complex)
+            return self._wrap(np.real(C).astype(np.int64).astype(self.dtype), half), \
+                self._wrap(np.imag(C).astype(np.int64).astype(self.dtype), half)
+        C = C.astype(object)
+        return self._wrap((C & (2 ** half - 1)).astype(self.dtype), half), \
+            self._wrap(((C >> half) & (2 ** half - 1)).astype(self.dtype), half)
+
+    def _wrap(self, val, bits):
+        val = val & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val).astype(self.dtype)
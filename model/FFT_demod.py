@@ -0,0 +1,156 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+complex_multiplier = load_model('complex_multiplier')
+fft = load_model('fft')
+
+def _clog2(val):
+    return int(np.ceil(np.log2(val)))
+
+class Model:
+    """
+    model of FFT_demod
+
+    A symbol starts after its CP, with HALF_CP_ADVANCE it starts CP2 / 2 samples earlier. The OUT_DW / 2 MSBs of
+    the FFT output are used. With HALF_CP_ADVANCE the phase rotation that comes from the CP advance is undone by
+    a multiplication with the tap LUT. m_axis_out_tuser is {SFN, subframe number, symbol number, blk_exp}.
+    The jumps for early or late SSB_start_i are not modeled, the symbols have to be complete.
+    """
+    SFN_MAX = 1023
+    SUBFRAMES_PER_FRAME = 20
+    SYM_PER_SF = 14
+
+    def __init__(self, IN_DW, HALF_CP_ADVANCE, OUT_DW, NFFT, BLK_EXP_LEN = 8, USE_TAP_FILE = 0, TAP_FILE = '', TAP_FILE_PATH = ''):
+        self.IN_DW = int(IN_DW)
+        self.HALF_CP_ADVANCE = int(HALF_CP_ADVANCE)
+        self.OUT_DW = int(OUT_DW)
+        self.NFFT = int(NFFT)
+        self.BLK_EXP_LEN = int(BLK_EXP_LEN)
+        self.USE_TAP_FILE = int(USE_TAP_FILE)
+        self.TAP_FILE = TAP_FILE
+        self.TAP_FILE_PATH = TAP_FILE_PATH
+        self.FFT_LEN = 2 ** self.NFFT
+        self.CP1 = 20 * self.FFT_LEN // 256
+        self.CP2 = 18 * self.FFT_LEN // 256
+        self.MAX_CP_LEN = self.CP1
+        self.SFN_WIDTH = _clog2(self.SFN_MAX)
+        self.SUBFRAME_NUMBER_WIDTH = _clog2(self.SUBFRAMES_PER_FRAME - 1)
+        self.SYMBOL_NUMBER_WIDTH = _clog2(self.SYM_PER_SF - 1)
+        self.CP_LEN_WIDTH = _clog2(self.MAX_CP_LEN)
+        self.META_WIDTH = self.SFN_WIDTH + self.SUBFRAME_NUMBER_WIDTH + self.SYMBOL_NUMBER_WIDTH
+        self.USER_WIDTH_IN = self.META_WIDTH + self.CP_LEN_WIDTH
+        self.USER_WIDTH_OUT = self.META_WIDTH + self.BLK_EXP_LEN
+        self.FFT_OUT_DW = self.IN_DW // 2 + self.NFFT
+        # TWDL_WIDTH and XSERIES do not change the result of the FFT model
+        self.fft = fft.Model(self.NFFT, 1, self.IN_DW // 2, self.IN_DW // 2, SHIFTED = 1, DBS = 1)
+        self.multiplier = complex_multiplier.Model(self.OUT_DW // 2, self.OUT_DW // 2, self.OUT_DW // 2, GROWTH_BITS = -2)
+        if self.HALF_CP_ADVANCE:
+            self.coeff_re, self.coeff_im = self._unpack_coeff(self.taps())
+
+    def taps(self):
+        """coeff of the HDL as packed {im, re} words"""
+        CP_ADVANCE = self.CP2 // 2
+        if self.TAP_FILE != '' or self.USE_TAP_FILE:
+            file_name = self.TAP_FILE
+            if file_name == '':
+                file_name = os.path.join(self.TAP_FILE_PATH,
+                    f'FFT_demod_taps_{self.NFFT}_{self.CP2}_{CP_ADVANCE}_{self.OUT_DW}.hex')
+            # $readmemh in the HDL needs the file as well, see tools/generate_FFT_demod_tap_file.py
+            if not os.path.exists(file_name):
+                raise FileNotFoundError(f'FFT_demod tap file {file_name} does not exist')
+            with open(file_name) as f:
+                return np.array([int(word, 16) for word in f.read().split()], np.int64)
+
+        # the initial block of the HDL rounds the real values to the nearest integer
+        PI = 3.1415926535
+        angle = 2 * PI * (self.CP2 - CP_ADVANCE) / self.FFT_LEN * np.arange(self.FFT_LEN) + PI * (self.CP2 - CP_ADVANCE)
+        amplitude = 2 ** (self.OUT_DW // 2 - 1) - 1
+        mask = 2 ** (self.OUT_DW // 2) - 1
+        re = np.array([int(round(val)) for val in np.cos(angle) * amplitude], np.int64) & mask
+        im = np.array([int(round(val)) for val in np.sin(angle) * amplitude], np.int64) & mask
+        return re + (im << (self.OUT_DW // 2))
+
+    def CP_len_used(self, CP_len):
+        """number of samples that are skipped at the start of a symbol with CP length CP_len"""
+        CP_len = np.asarray(CP_len, np.int64)
+        return CP_len - (self.CP2 >> 1) if self.HALF_CP_ADVANCE else CP_len
+
+    def select(self, symbols, CP_len):
+        """
+        FFT input of every symbol with shape (num_symbols, FFT_LEN)
+
+        symbols is a list of symbols including their CP, or an array of shape (num_symbols, CP_len + FFT_LEN)
+        if all symbols have the same CP_len.
+        """
+        skip = np.broadcast_to(self.CP_len_used(CP_len), (len(symbols),))
+        if isinstance(symbols, np.ndarray) and symbols.ndim == 2 and np.all(skip == skip[0]):
+            return symbols[:, skip[0]:][:, :self.FFT_LEN]
+        return np.array([np.asarray(symbol)[start:][:self.FFT_LEN] for symbol, start in zip(symbols, skip)])
+
+    def demod(self, data, meta = 0):
+        """
+        returns re and im of m_axis_out_tdata with shape (num_symbols, FFT_LEN) and m_axis_out_tuser per symbol
+
+        data is the FFT input with shape (num_symbols, FFT_LEN) as packed {im, re} words or complex integers,
+        meta is {SFN, subframe number, symbol number} per symbol.
+        """
+        data_re, data_im = self._unpack(data)
+        num_symbols = data_re.shape[0]
+        fft_re, fft_im, blk_exp = self.fft.fft(data_re, data_im)
+        out_re, out_im = self.output(fft_re, fft_im)
+        meta = np.broadcast_to(np.asarray(meta, np.int64) & (2 ** self.META_WIDTH - 1), (num_symbols,))
+        tuser = (meta << self.BLK_EXP_LEN) + (blk_exp & (2 ** self.BLK_EXP_LEN - 1))
+        return out_re, out_im, tuser
+
+    def output(self, fft_re, fft_im):
+        """re and im of m_axis_out_tdata for the FFT result, the OUT_DW / 2 MSBs rotated by the taps with HALF_CP_ADVANCE"""
+        shift = self.FFT_OUT_DW - self.OUT_DW // 2
+        out_re = self._wrap(np.asarray(fft_re, np.int64) >> shift, self.OUT_DW // 2)
+        out_im = self._wrap(np.asarray(fft_im, np.int64) >> shift, self.OUT_DW // 2)
+        if self.HALF_CP_ADVANCE:
+            out_re, out_im = self.multiplier.multiply(out_re, out_im, self.coeff_re, self.coeff_im)
+        return out_re, out_im
+
+    def process(self, symbols, tuser):
+        """demod() for symbols including their CP, tuser is s_axis_in_tuser {SFN, subframe, symbol, CP_len} per symbol"""
+        tuser = np.broadcast_to(np.asarray(tuser, np.int64), (len(symbols),))
+        CP_len = tuser & (2 ** self.CP_LEN_WIDTH - 1)
+        return self.demod(self.select(symbols, CP_len), tuser >> self.CP_LEN_WIDTH)
+
+    def unpack_tuser(self, tuser):
+        """returns SFN, subframe number, symbol number and blk_exp of m_axis_out_tuser"""
+        tuser = np.asarray(tuser, np.int64)
+        blk_exp = tuser & (2 ** self.BLK_EXP_LEN - 1)
+        tuser = tuser >> self.BLK_EXP_LEN
+        sym = tuser & (2 ** self.SYMBOL_NUMBER_WIDTH - 1)
+        tuser = tuser >> self.SYMBOL_NUMBER_WIDTH
+        subframe = tuser & (2 ** self.SUBFRAME_NUMBER_WIDTH - 1)
+        SFN = tuser >> self.SUBFRAME_NUMBER_WIDTH
+        return SFN, subframe, sym, blk_exp
+
+    def _unpack_coeff(self, taps):
+        half = self.OUT_DW // 2
+        return self._wrap(taps & (2 ** half - 1), half), self._wrap((taps >> half) & (2 ** half - 1), half)
+
+    def _unpack(self, data):
+        half = self.IN_DW // 2
+        data = np.asarray(data) if isinstance(data, np.ndarray) else np.asarray(data, dtype = object)
+        data = np.atleast_2d(data)
+        if np.iscomplexobj(data) or (data.size and isinstance(data.flat[0], complex)):
+            data = data.astype(complex)
+            return self._wrap(np.real(data).astype(np.int64), half), self._wrap(np.imag(data).astype(np.int64), half)
+        data = data.astype(object)
+        return self._wrap((data & (2 ** half - 1)).astype(np.int64), half), \
+            self._wrap(((data >> half) & (2 ** half - 1)).astype(np.int64), half)
+
+    def _wrap(self, val, bits):
+        val = np.asarray(val, np.int64) & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val)
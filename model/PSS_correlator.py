@@ -1,4 +1,15 @@
 import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+tap_loader = load_model('tap_loader')
 
 def _twos_comp(val, bits):
     """compute the 2's complement of int value val"""
@@ -6,22 +17,32 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+def _twos_comp_array(val, bits, dtype = np.int64):
+    """compute the 2's complement of every element in an int64 or object int array"""
+    val = np.asarray(val).astype(dtype) & ((1 << bits) - 1)
+    return np.where(val & (1 << (bits - 1)), val - (1 << bits), val).astype(dtype)
+
 class Model:
+    PIPELINE_STAGES = 3
+
     def __init__(self, IN_DW, OUT_DW, TAP_DW, PSS_LEN, PSS_LOCAL, ALGO, USE_TAP_FILE = 0, TAP_FILE = ''):
         self.PSS_LEN = int(PSS_LEN)
         self.OUT_DW = int(OUT_DW)
         self.TAP_DW = int(TAP_DW)
         self.IN_DW = int(IN_DW)
+        self.ALGO = int(ALGO)
         self.POSSIBLE_IN_DW = int(self.OUT_DW - (np.ceil(np.log2(self.PSS_LEN) + 1)) * 2  - 3)
         self.IN_OP_DW = self.POSSIBLE_IN_DW // 2
         self.TAP_OP_DW = self.POSSIBLE_IN_DW // 2 + (self.POSSIBLE_IN_DW % 2)
+        # products, the sum over all taps, the ALGO=1 input folding and the magnitude approximation
+        # need at most this many bits, use python ints inside numpy arrays if int64 is not wide enough
+        self.DATAPATH_DW = self.IN_DW // 2 + self.TAP_DW // 2 + int(np.ceil(np.log2(self.PSS_LEN))) + 3
+        self.dtype = np.int64 if self.DATAPATH_DW <= 63 else object
 
         # print(f'model IN_DW = {IN_DW}')
         # print(f'model OUT_DW = {OUT_DW}')
         # print(f'model PSS_LEN = {PSS_LEN}')
         # print(f'model PSS_LOCAL = {PSS_LOCAL}')
-        self.taps = np.empty(PSS_LEN, 'complex')
-
         if False:
             # don't do rounding for truncations, because its also not implemented in HDL
             if self.trunc_taps > 1:
@@ -33,20 +54,12 @@ class Model:
 
         if USE_TAP_FILE:
             print(f'using tap file {TAP_FILE}')
-            temp_taps = np.loadtxt(TAP_FILE, delimiter = ' ', dtype = int, converters={0:lambda s: int(s, 16)})
-
-        for i in range(PSS_LEN):
-            if USE_TAP_FILE:
-                self.taps[i] = _twos_comp(temp_taps[i]                          & (2 ** (self.TAP_DW // 2) - 1), self.TAP_DW // 2) \
-                        + 1j * _twos_comp((temp_taps[i] >> (self.TAP_DW // 2))  & (2 ** (self.TAP_DW // 2) - 1), self.TAP_DW // 2)
-            else:
-                self.taps[i] =    _twos_comp(((PSS_LOCAL >> (self.TAP_DW * i))                    & (2 ** (self.TAP_DW // 2) - 1)),
-                                self.TAP_DW // 2) \
-                            + 1j*_twos_comp(((PSS_LOCAL >> (self.TAP_DW * i + self.TAP_DW // 2)) & (2 ** (self.TAP_DW // 2) - 1)),
-                                self.TAP_DW // 2)
+        tap_re, tap_im = tap_loader.load_taps(self.TAP_DW, self.PSS_LEN, PSS_LOCAL, USE_TAP_FILE, TAP_FILE)
+        self.tap_re = tap_re.astype(self.dtype)
+        self.tap_im = tap_im.astype(self.dtype)
 
         # for i in range(PSS_LEN):
-        #     print(f'taps[{i}] = {self.taps[i]}')
+        #     print(f'taps[{i}] = {self.tap_re[i]} + j{self.tap_im[i]}')
 
         self.reset()
 
@@ -56,39 +69,161 @@ class Model:
         self.valid[0] = False
 
         if self.in_buffer is not None:
-            self.in_pipeline[1:] = self.in_pipeline[:-1]
-            self.in_pipeline[0] = self.in_buffer
+            self.in_pipeline_re[1:] = self.in_pipeline_re[:-1]
+            self.in_pipeline_im[1:] = self.in_pipeline_im[:-1]
+            self.in_pipeline_re[0], self.in_pipeline_im[0] = self.in_buffer
             self.valid[0] = True
             self.in_buffer = None
 
-            result_re = 0
-            result_im = 0
-            for i in range(self.PSS_LEN):
-                # bit growth inside this loop is ceil(log2(PSS_LEN)) + IN_DW/2 for result_re and result_im
-                result_re += (  int(self.taps[i].real) * int(self.in_pipeline[i].real) \
-                                - int(self.taps[i].imag) * int(self.in_pipeline[i].imag))
-                result_im += (  int(self.taps[i].real) * int(self.in_pipeline[i].imag) \
-                                + int(self.taps[i].imag) * int(self.in_pipeline[i].real))
+            in_re = self.in_pipeline_re
+            in_im = self.in_pipeline_im
+            if self.ALGO == 0:
+                # bit growth inside this sum is ceil(log2(PSS_LEN)) + IN_DW/2 for result_re and result_im
+                result_re = np.dot(self.tap_re, in_re) - np.dot(self.tap_im, in_im)
+                result_im = np.dot(self.tap_re, in_im) + np.dot(self.tap_im, in_re)
+            else:
+                # PSS is complex conjugate centrally symmetric, so tap[PSS_LEN - i] is replaced by conj(tap[i])
+                # tap[0] and tap[PSS_LEN / 2] are not used, like in the HDL
+                half = self.PSS_LEN // 2
+                tap_re = self.tap_re[1:half]
+                tap_im = self.tap_im[1:half]
+                mirror = slice(self.PSS_LEN - 1, half, -1)
+                result_re = np.dot(tap_re, in_re[mirror] + in_re[1:half]) + np.dot(tap_im, in_im[mirror] - in_im[1:half])
+                result_im = np.dot(tap_re, in_im[mirror] + in_im[1:half]) - np.dot(tap_im, in_re[mirror] - in_re[1:half])
             # result_abs = result_re ** 2 + result_im ** 2
-            if np.abs(result_re) > np.abs(result_im):
-                result_abs = np.abs(result_re) + (int(np.abs(result_im))>>2)
+            abs_re = abs(int(result_re))
+            abs_im = abs(int(result_im))
+            if abs_re > abs_im:
+                result_abs = abs_re + (abs_im >> 2)
             else:
-                result_abs = np.abs(result_im) + (int(np.abs(result_re))>>2)
-            truncate = int(np.ceil(np.log2(self.PSS_LEN)) + self.IN_DW//2 + self.TAP_DW//2 + 1 - self.OUT_DW)
-            if truncate < 0:
-                truncate = 0
-            self.result[0] = (result_abs >> truncate) & (2 ** self.OUT_DW - 1)
+                result_abs = abs_im + (abs_re >> 2)
+            self.result[0] = (result_abs >> self._truncate()) & (2 ** self.OUT_DW - 1)
+
+    def correlate(self, data_in):
+        """
+        correlate a whole waveform in one pass, starting from the reset state
+
+        data_in can either be packed IN_DW samples like for set_data() or complex samples with integer values.
+        The returned result and valid arrays have len(data_in) + PIPELINE_STAGES - 1 elements,
+        element t is what get_data() and data_valid() return after the t-th tick(), if one sample
+        is set before each tick. result[valid] are the outputs for all samples in data_in.
+        """
+        in_re, in_im = self._unpack(data_in)
+        history = np.zeros(self.PSS_LEN - 1, self.dtype)
+        result_abs = self._correlate(np.concatenate((history, in_re)), np.concatenate((history, in_im)))
+
+        latency = self.PIPELINE_STAGES - 1
+        result = np.zeros(len(result_abs) + latency, self.dtype)
+        valid = np.zeros(len(result_abs) + latency, bool)
+        result[latency:] = result_abs
+        valid[latency:] = True
+        return result, valid
+
+    def feed(self, data_in):
+        """
+        streaming version of correlate(), equivalent to one set_data() and tick() per sample
+
+        The last PSS_LEN - 1 samples and the result/valid pipeline are carried over to the next call,
+        so the outputs do not depend on how a waveform is split into chunks.
+        Returns the outputs that became valid while processing this chunk.
+        """
+        in_re, in_im = self._unpack(data_in)
+        num_samples = len(in_re)
+        if num_samples == 0:
+            return np.zeros(0, self.dtype)
+        in_re = np.concatenate((self.in_pipeline_re[self.PSS_LEN - 2::-1], in_re))
+        in_im = np.concatenate((self.in_pipeline_im[self.PSS_LEN - 2::-1], in_im))
+        self.in_pipeline_re = in_re[::-1][:self.PSS_LEN].copy()
+        self.in_pipeline_im = in_im[::-1][:self.PSS_LEN].copy()
+
+        # stage_valid[k + 1] is the valid flag at the pipeline output after the k-th tick of this chunk
+        stage_valid = np.concatenate((self.valid[::-1], np.ones(num_samples, bool)))
+        stage_result = np.concatenate((self.result[::-1], self._correlate(in_re, in_im)))
+        self.valid = stage_valid[num_samples:][::-1].copy()
+        self.result = stage_result[num_samples:][::-1].copy()
+        return stage_result[1:num_samples + 1][stage_valid[1:num_samples + 1]]
+
+    def stream(self, chunks):
+        """generator that feeds an iterable of chunks and yields the outputs of each chunk"""
+        for chunk in chunks:
+            yield self.feed(chunk)
+
+    def _correlate(self, in_re, in_im):
+        # the first PSS_LEN - 1 samples are only used as history, one output is calculated for every following sample
+        num_out = len(in_re) - (self.PSS_LEN - 1)
+        tap_re = self.tap_re
+        tap_im = self.tap_im
+
+        # in_pipeline[i] holds the sample that was received i ticks ago,
+        # which is in_re[PSS_LEN - 1 - i:][:num_out] for all outputs
+        result_re = np.zeros(num_out, self.dtype)
+        result_im = np.zeros(num_out, self.dtype)
+        if self.ALGO == 0:
+            for i in range(self.PSS_LEN):
+                start = self.PSS_LEN - 1 - i
+                result_re += tap_re[i] * in_re[start:start + num_out] - tap_im[i] * in_im[start:start + num_out]
+                result_im += tap_re[i] * in_im[start:start + num_out] + tap_im[i] * in_re[start:start + num_out]
+        else:
+            for i in range(1, self.PSS_LEN // 2):
+                start = self.PSS_LEN - 1 - i
+                mirror = i - 1
+                sum_re = in_re[mirror:mirror + num_out] + in_re[start:start + num_out]
+                sum_im = in_im[mirror:mirror + num_out] + in_im[start:start + num_out]
+                diff_re = in_re[mirror:mirror + num_out] - in_re[start:start + num_out]
+                diff_im = in_im[mirror:mirror + num_out] - in_im[start:start + num_out]
+                result_re += tap_re[i] * sum_re + tap_im[i] * diff_im
+                result_im += tap_re[i] * sum_im - tap_im[i] * diff_re
+
+        abs_re = np.abs(result_re)
+        abs_im = np.abs(result_im)
+        result_abs = np.where(abs_re > abs_im, abs_re + (abs_im >> 2), abs_im + (abs_re >> 2))
+        return (result_abs >> self._truncate()) & (2 ** self.OUT_DW - 1)
+
+    def effective_taps(self):
+        """re and im of the direct form taps that give the same result as the selected ALGO"""
+        if self.ALGO == 0:
+            return self.tap_re.copy(), self.tap_im.copy()
+        half = self.PSS_LEN // 2
+        tap_re = np.zeros(self.PSS_LEN, self.dtype)
+        tap_im = np.zeros(self.PSS_LEN, self.dtype)
+        tap_re[1:half] = self.tap_re[1:half]
+        tap_im[1:half] = self.tap_im[1:half]
+        tap_re[self.PSS_LEN - 1:half:-1] = self.tap_re[1:half]
+        tap_im[self.PSS_LEN - 1:half:-1] = -self.tap_im[1:half]
+        return tap_re, tap_im
+
+    def _unpack(self, data_in):
+        mask = 2 ** (self.IN_DW // 2) - 1
+        if not isinstance(data_in, np.ndarray):
+            # keep python ints exact, np.asarray() would convert ints >= 2 ** 63 to float
+            data_in = np.array(data_in, dtype = object if not np.iscomplexobj(data_in) else complex)
+        if np.iscomplexobj(data_in):
+            in_re = np.real(data_in).astype(np.int64)
+            in_im = np.imag(data_in).astype(np.int64)
+        elif self.IN_DW <= 64:
+            data_in = data_in.astype(np.uint64)
+            in_re = (data_in & np.uint64(mask)).astype(np.int64)
+            in_im = ((data_in >> np.uint64(self.IN_DW // 2)) & np.uint64(mask)).astype(np.int64)
+        else:
+            data_in = data_in.astype(object)
+            in_re = data_in & mask
+            in_im = (data_in >> (self.IN_DW // 2)) & mask
+        return _twos_comp_array(in_re, self.IN_DW // 2, self.dtype), _twos_comp_array(in_im, self.IN_DW // 2, self.dtype)
+
+    def _truncate(self):
+        truncate = int(np.ceil(np.log2(self.PSS_LEN)) + self.IN_DW//2 + self.TAP_DW//2 + 1 - self.OUT_DW)
+        return max(truncate, 0)
 
     def set_data(self, data_in):
-        self.in_buffer =      _twos_comp((data_in & (2 ** (self.IN_DW // 2) - 1)),                        self.IN_DW // 2) \
-                         + 1j*_twos_comp(((data_in >> (self.IN_DW // 2)) & (2 ** (self.IN_DW // 2) - 1)), self.IN_DW // 2)
+        self.in_buffer = (_twos_comp((data_in & (2 ** (self.IN_DW // 2) - 1)),                        self.IN_DW // 2),
+                          _twos_comp(((data_in >> (self.IN_DW // 2)) & (2 ** (self.IN_DW // 2) - 1)), self.IN_DW // 2))
 
     def reset(self):
-        self.in_pipeline = np.zeros(self.PSS_LEN, 'complex')
+        self.in_pipeline_re = np.zeros(self.PSS_LEN, self.dtype)
+        self.in_pipeline_im = np.zeros(self.PSS_LEN, self.dtype)
         self.in_buffer = None
-        pipeline_stages = 3
-        self.valid = np.zeros(pipeline_stages, bool)
-        self.result = np.zeros(pipeline_stages)
+        self.valid = np.zeros(self.PIPELINE_STAGES, bool)
+        self.result = np.zeros(self.PIPELINE_STAGES, self.dtype)
 
     def data_valid(self):
         return self.valid[-1]
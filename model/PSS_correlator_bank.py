@@ -0,0 +1,78 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+PSS_correlator = load_model('PSS_correlator')
+
+class Model:
+    """
+    correlates one input stream against the tap sets of all N_id_2 in a single pass, like the
+    three PSS_correlator instances inside PSS_detector
+
+    PSS_LOCAL and TAP_FILE are lists with one entry per N_id_2, the other parameters are the same as for
+    PSS_correlator.Model. Every branch is bit-exact with PSS_correlator.Model.
+    """
+    def __init__(self, IN_DW, OUT_DW, TAP_DW, PSS_LEN, PSS_LOCAL, ALGO, USE_TAP_FILE = 0, TAP_FILE = ''):
+        self.PSS_LEN = int(PSS_LEN)
+        if USE_TAP_FILE:
+            PSS_LOCAL = [0] * len(TAP_FILE)
+        else:
+            TAP_FILE = [''] * len(PSS_LOCAL)
+        self.correlators = [PSS_correlator.Model(IN_DW, OUT_DW, TAP_DW, PSS_LEN, pss_local, ALGO, USE_TAP_FILE, tap_file)
+                            for pss_local, tap_file in zip(PSS_LOCAL, TAP_FILE)]
+        self.ALGO = int(ALGO)
+        # shape (num_N_id_2, PSS_LEN, 1) so that every tap broadcasts over the input window
+        self.dtype = self.correlators[0].dtype
+        self.tap_re = np.array([correlator.tap_re for correlator in self.correlators], self.dtype)[:, :, None]
+        self.tap_im = np.array([correlator.tap_im for correlator in self.correlators], self.dtype)[:, :, None]
+
+    def correlate(self, data_in):
+        """
+        correlate a whole waveform against all tap sets, starting from the reset state
+
+        Returns scores with shape (num_N_id_2, len(data_in)) and the N_id_2 with the highest score for every sample,
+        ties are resolved to the lowest N_id_2. scores[N_id_2] is identical to result[valid] of
+        PSS_correlator.Model.correlate() for that N_id_2.
+        """
+        correlator = self.correlators[0]
+        in_re, in_im = correlator._unpack(data_in)
+        num_samples = len(in_re)
+        history = np.zeros(self.PSS_LEN - 1, self.dtype)
+        in_re = np.concatenate((history, in_re))
+        in_im = np.concatenate((history, in_im))
+
+        result_re = np.zeros((len(self.correlators), num_samples), self.dtype)
+        result_im = np.zeros((len(self.correlators), num_samples), self.dtype)
+        if self.ALGO == 0:
+            for i in range(self.PSS_LEN):
+                # the input window is shared by all branches
+                start = self.PSS_LEN - 1 - i
+                window_re = in_re[start:start + num_samples]
+                window_im = in_im[start:start + num_samples]
+                result_re += self.tap_re[:, i] * window_re - self.tap_im[:, i] * window_im
+                result_im += self.tap_re[:, i] * window_im + self.tap_im[:, i] * window_re
+        else:
+            # the PSS taps are conjugate symmetric, the folded inputs are computed once and shared by all branches,
+            # which needs PSS_LEN / 2 - 1 products per branch instead of PSS_LEN
+            for i in range(1, self.PSS_LEN // 2):
+                start = self.PSS_LEN - 1 - i
+                mirror = i - 1
+                sum_re = in_re[mirror:mirror + num_samples] + in_re[start:start + num_samples]
+                sum_im = in_im[mirror:mirror + num_samples] + in_im[start:start + num_samples]
+                diff_re = in_re[mirror:mirror + num_samples] - in_re[start:start + num_samples]
+                diff_im = in_im[mirror:mirror + num_samples] - in_im[start:start + num_samples]
+                result_re += self.tap_re[:, i] * sum_re + self.tap_im[:, i] * diff_im
+                result_im += self.tap_re[:, i] * sum_im - self.tap_im[:, i] * diff_re
+
+        abs_re = np.abs(result_re)
+        abs_im = np.abs(result_im)
+        result_abs = np.where(abs_re > abs_im, abs_re + (abs_im >> 2), abs_im + (abs_re >> 2))
+        scores = (result_abs >> correlator._truncate()) & (2 ** correlator.OUT_DW - 1)
+        return scores, np.argmax(scores, axis = 0)
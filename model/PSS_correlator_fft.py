@@ -0,0 +1,113 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+PSS_correlator = load_model('PSS_correlator')
+
+class Model:
+    """
+    overlap-save FFT correlation of long captures against several PSS tap sets
+
+    PSS_LOCAL and TAP_FILE are lists with one entry per N_id_2, the other parameters are the same as for
+    PSS_correlator.Model. The FFT results are only approximate, therefore find_peaks() recalculates the
+    neighborhood of every candidate peak with the bit-exact direct form of PSS_correlator.Model.
+    """
+    def __init__(self, IN_DW, OUT_DW, TAP_DW, PSS_LEN, PSS_LOCAL, ALGO, USE_TAP_FILE = 0, TAP_FILE = '', BLOCK_LEN = 2 ** 16):
+        self.PSS_LEN = int(PSS_LEN)
+        if USE_TAP_FILE:
+            PSS_LOCAL = [0] * len(TAP_FILE)
+        else:
+            TAP_FILE = [''] * len(PSS_LOCAL)
+        self.correlators = [PSS_correlator.Model(IN_DW, OUT_DW, TAP_DW, PSS_LEN, pss_local, ALGO, USE_TAP_FILE, tap_file)
+                            for pss_local, tap_file in zip(PSS_LOCAL, TAP_FILE)]
+
+        # every FFT block produces STEP new outputs, the remaining PSS_LEN - 1 samples are history
+        self.FFT_LEN = 2 ** int(np.ceil(np.log2(int(BLOCK_LEN) + self.PSS_LEN - 1)))
+        self.STEP = self.FFT_LEN - (self.PSS_LEN - 1)
+        taps = np.array([tap_re.astype(float) + 1j * tap_im.astype(float)
+                         for tap_re, tap_im in (correlator.effective_taps() for correlator in self.correlators)])
+        self.taps_fft = np.fft.fft(taps, self.FFT_LEN, axis = 1)
+
+    def correlate_blocks(self, data_in):
+        """
+        generator that yields (start, corr) tuples, corr has shape (num_N_id_2, STEP) and contains the raw complex
+        correlation sum_re + 1j * sum_im for the samples start ... start + STEP - 1
+
+        data_in can be packed or complex samples like for PSS_correlator.Model.correlate(), only one block
+        of it is unpacked at a time, so memory mapped captures can be processed with bounded memory.
+        """
+        history = np.zeros(self.PSS_LEN - 1, 'complex')
+        for start in range(0, len(data_in), self.STEP):
+            in_re, in_im = self.correlators[0]._unpack(data_in[start:start + self.STEP])
+            segment = np.concatenate((history, in_re + 1j * in_im))
+            history = segment[len(segment) - (self.PSS_LEN - 1):]
+            corr = np.fft.ifft(np.fft.fft(segment, self.FFT_LEN) * self.taps_fft, axis = 1)
+            yield start, corr[:, self.PSS_LEN - 1:len(segment)]
+
+    def correlate(self, data_in):
+        """raw complex correlation of the whole waveform, returns an array with shape (num_N_id_2, len(data_in))"""
+        blocks = [corr for _, corr in self.correlate_blocks(data_in)]
+        if not blocks:
+            return np.empty((len(self.correlators), 0), 'complex')
+        return np.concatenate(blocks, axis = 1)
+
+    def score(self, corr):
+        """approximate PSS_correlator output for a raw complex correlation"""
+        result_re = np.rint(corr.real).astype(np.int64)
+        result_im = np.rint(corr.imag).astype(np.int64)
+        abs_re = np.abs(result_re)
+        abs_im = np.abs(result_im)
+        result_abs = np.where(abs_re > abs_im, abs_re + (abs_im >> 2), abs_im + (abs_re >> 2))
+        correlator = self.correlators[0]
+        return (result_abs >> correlator._truncate()) & (2 ** correlator.OUT_DW - 1)
+
+    def verify(self, data_in, N_id_2, start, end):
+        """bit-exact PSS_correlator output for the samples start ... end - 1, calculated with the direct form"""
+        history_start = max(start - (self.PSS_LEN - 1), 0)
+        result, valid = self.correlators[N_id_2].correlate(data_in[history_start:end])
+        return result[valid][start - history_start:]
+
+    def find_peaks(self, data_in, threshold, radius = 2, margin = 2):
+        """
+        find all samples whose bit-exact score is > threshold
+
+        Samples with an approximate score > threshold - margin are candidates, the scores in a neighborhood
+        of +-radius samples around every candidate are recalculated with verify().
+        Returns a list of (position, N_id_2, score) tuples sorted by position.
+        """
+        peaks = []
+        # neighborhoods can reach into the next block, don't verify these samples twice
+        verified_end = [0] * len(self.correlators)
+        for start, corr in self.correlate_blocks(data_in):
+            scores = self.score(corr)
+            for N_id_2 in range(len(self.correlators)):
+                candidates = np.flatnonzero(scores[N_id_2] > threshold - margin) + start
+                for lo, hi in self._neighborhoods(candidates, radius, len(data_in)):
+                    lo = max(lo, verified_end[N_id_2])
+                    if lo >= hi:
+                        continue
+                    verified_end[N_id_2] = hi
+                    exact = self.verify(data_in, N_id_2, lo, hi)
+                    for pos in np.flatnonzero(exact > threshold):
+                        peaks.append((int(lo + pos), N_id_2, int(exact[pos])))
+        peaks.sort()
+        return peaks
+
+    def _neighborhoods(self, candidates, radius, num_samples):
+        # merge overlapping neighborhoods, so that every sample is only verified once
+        ranges = []
+        for pos in candidates:
+            lo = max(pos - radius, 0)
+            hi = min(pos + radius + 1, num_samples)
+            if ranges and lo <= ranges[-1][1]:
+                ranges[-1][1] = hi
+            else:
+                ranges.append([lo, hi])
+        return ranges
@@ -0,0 +1,115 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+PSS_correlator = load_model('PSS_correlator')
+
+class Model:
+    """
+    model of PSS_correlator_mr, which computes the same correlation as PSS_correlator with ALGO=0,
+    but reuses every complex multiplier for MULT_REUSE taps
+
+    The taps are split into REQ_MULTS groups of MULT_REUSE taps, C0 is the sum of the first REQ_MULTS / 2 groups
+    and C1 the sum of the remaining groups. All sums wrap at REQUIRED_OUT_DW bits like in the HDL.
+    """
+    MULT_STAGES = 3  # pipeline stages of complex_multiplier
+
+    def __init__(self, IN_DW, OUT_DW, TAP_DW, PSS_LEN, PSS_LOCAL, MULT_REUSE, USE_TAP_FILE = 0, TAP_FILE = '', START_DELAY = 1):
+        self.IN_DW = int(IN_DW)
+        self.OUT_DW = int(OUT_DW)
+        self.TAP_DW = int(TAP_DW)
+        self.PSS_LEN = int(PSS_LEN)
+        self.MULT_REUSE = int(MULT_REUSE)
+        self.START_DELAY = int(START_DELAY)
+        self.REQUIRED_OUT_DW = self.IN_DW // 2 + self.TAP_DW // 2 + 1 + int(np.ceil(np.log2(self.PSS_LEN)))
+        self.C_DW = 2 * self.REQUIRED_OUT_DW
+        self.REQ_MULTS = int(np.ceil(self.PSS_LEN / self.MULT_REUSE))
+        if self.REQ_MULTS < 2:
+            raise ValueError(f'MULT_REUSE = {MULT_REUSE} is not supported, REQ_MULTS has to be at least 2')
+        # number of taps that are summed up in C0
+        self.C0_LEN = (self.REQ_MULTS // 2) * self.MULT_REUSE
+        # clock cycles from s_axis_in_tvalid to m_axis_out_tvalid:
+        # MULT_REUSE multiplications + multiplier pipeline + accumulator + sum + 2 output stages
+        self.LATENCY = self.MULT_REUSE + self.MULT_STAGES + 4
+
+        self.correlator = PSS_correlator.Model(IN_DW, OUT_DW, TAP_DW, PSS_LEN, PSS_LOCAL, 0, USE_TAP_FILE, TAP_FILE)
+        self.dtype = self.correlator.dtype
+        self.tap_re = self.correlator.tap_re
+        self.tap_im = self.correlator.tap_im
+
+    def correlate(self, data_in, SAMPLE_INTERVAL = None):
+        """
+        correlate a whole waveform, starting from the reset state
+
+        SAMPLE_INTERVAL is the number of clock cycles between two valid input samples, it defaults to MULT_REUSE.
+        It only matters for the START_DELAY logic, which zeroes the multiplier inputs until the input buffer is filled.
+        Returns m_axis_out_tdata, C0_o and C1_o for every input sample, C0 and C1 as complex integers.
+        """
+        if SAMPLE_INTERVAL is None:
+            SAMPLE_INTERVAL = self.MULT_REUSE
+        self._check_interval(SAMPLE_INTERVAL)
+        in_re, in_im = self.correlator._unpack(data_in)
+        num_samples = len(in_re)
+        history = np.zeros(self.PSS_LEN - 1, self.dtype)
+        in_re = np.concatenate((history, in_re))
+        in_im = np.concatenate((history, in_im))
+
+        C0_re, C0_im = self._partial_sum(in_re, in_im, 0, self.C0_LEN)
+        C1_re, C1_im = self._partial_sum(in_re, in_im, self.C0_LEN, self.PSS_LEN)
+        sum_re = self._wrap(C0_re + C1_re)
+        sum_im = self._wrap(C0_im + C1_im)
+
+        if self.START_DELAY:
+            # start_f is set one valid sample later if samples arrive back to back
+            num_zero = self.PSS_LEN if SAMPLE_INTERVAL == 1 else self.PSS_LEN - 1
+            for arr in (C0_re, C0_im, C1_re, C1_im, sum_re, sum_im):
+                arr[:num_zero] = 0
+
+        mask = 2 ** self.REQUIRED_OUT_DW - 1
+        abs_re = np.abs(sum_re) & mask
+        abs_im = np.abs(sum_im) & mask
+        filter_result = np.where(abs_im > abs_re, abs_im + (abs_re >> 2), abs_re + (abs_im >> 2)) & mask
+        if self.REQUIRED_OUT_DW >= self.OUT_DW:
+            result = filter_result >> (self.REQUIRED_OUT_DW - self.OUT_DW)
+        else:
+            result = filter_result
+        return result, C0_re + 1j * C0_im, C1_re + 1j * C1_im
+
+    def output_cycles(self, input_cycles):
+        """clock cycles at which m_axis_out_tvalid is high for inputs with s_axis_in_tvalid at input_cycles"""
+        input_cycles = np.asarray(input_cycles, np.int64)
+        if len(input_cycles) > 1:
+            self._check_interval(np.min(np.diff(input_cycles)))
+        return input_cycles + self.LATENCY
+
+    def pack_C(self, C):
+        """pack complex C0 or C1 values into C_DW bit words like C0_o and C1_o"""
+        mask = 2 ** self.REQUIRED_OUT_DW - 1
+        C_re = np.real(C).astype(np.int64).astype(self.dtype) & mask
+        C_im = np.imag(C).astype(np.int64).astype(self.dtype) & mask
+        return [(int(im) << self.REQUIRED_OUT_DW) + int(re) for re, im in zip(C_re, C_im)]
+
+    def _check_interval(self, interval):
+        if self.MULT_REUSE > 1 and interval < self.MULT_REUSE:
+            raise ValueError(f'input samples need to be at least MULT_REUSE = {self.MULT_REUSE} cycles apart, got {interval}')
+
+    def _partial_sum(self, in_re, in_im, first_tap, last_tap):
+        # the first PSS_LEN - 1 samples of in_re and in_im are history
+        num_out = len(in_re) - (self.PSS_LEN - 1)
+        result_re = np.zeros(num_out, self.dtype)
+        result_im = np.zeros(num_out, self.dtype)
+        for i in range(first_tap, last_tap):
+            start = self.PSS_LEN - 1 - i
+            result_re += self.tap_re[i] * in_re[start:start + num_out] - self.tap_im[i] * in_im[start:start + num_out]
+            result_im += self.tap_re[i] * in_im[start:start + num_out] + self.tap_im[i] * in_re[start:start + num_out]
+        return self._wrap(result_re), self._wrap(result_im)
+
+    def _wrap(self, val):
+        return PSS_correlator._twos_comp_array(val, self.REQUIRED_OUT_DW, self.dtype)
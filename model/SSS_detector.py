@@ -0,0 +1,124 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+lfsr = load_model('lfsr')
+
+SSS_LEN = 127
+N_id_1_MAX = 335
+N_id_MAX = 1007
+
+# SSS of all N_id, shape (N_id_MAX + 1, SSS_LEN), created on first use
+_sss_matrix = None
+
+def m_sequences():
+    """the m-sequences x0 and x1 from 38.211 7.4.2.3.1, which are generated by the two LFSRs in the HDL"""
+    x0 = lfsr.Model(7, 0x11, 1).generate(SSS_LEN)[0].astype(np.int8)
+    x1 = lfsr.Model(7, 0x03, 1).generate(SSS_LEN)[0].astype(np.int8)
+    return x0, x1
+
+def sss_matrix():
+    """returns a read-only int8 matrix with the SSS of N_id = 3 * N_id_1 + N_id_2 in row N_id"""
+    global _sss_matrix
+    if _sss_matrix is None:
+        x0, x1 = m_sequences()
+        N_id = np.arange(N_id_MAX + 1)
+        N_id_1 = N_id // 3
+        N_id_2 = N_id % 3
+        m0 = 15 * (N_id_1 // 112) + 5 * N_id_2
+        m1 = N_id_1 % 112
+        n = np.arange(SSS_LEN)
+        d = (1 - 2 * x0[(n + m0[:, None]) % SSS_LEN]) * (1 - 2 * x1[(n + m1[:, None]) % SSS_LEN])
+        _sss_matrix = d.astype(np.int8)
+        _sss_matrix.setflags(write = False)
+    return _sss_matrix
+
+class Model:
+    """
+    model of SSS_detector
+
+    The HDL only uses the sign of the real and imaginary part of every subcarrier. For every N_id_1 it counts
+    matches minus mismatches over the first SSS_LEN - 1 subcarriers, the last subcarrier is not compared.
+    The score is the larger absolute value of the I and Q counts, the first N_id_1 with the highest score wins.
+    If all scores are 0, the outputs keep the previous detection.
+    """
+    # every N_id_1 takes SSS_LEN clock cycles in STATE_DETECT_SSS
+    DETECT_CYCLES = (N_id_1_MAX + 1) * SSS_LEN
+
+    def __init__(self, IN_DW):
+        self.IN_DW = int(IN_DW)
+        self.sss = sss_matrix()
+        # only the first SSS_LEN - 1 subcarriers are compared
+        self.sss_T = self.sss[:, :SSS_LEN - 1].T.astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self.N_id_1_det = 0
+        self.N_id_det = 0
+
+    def scores(self, data_in, N_id_2):
+        """integer scores of all N_id_1 with shape (num_SSS, N_id_1_MAX + 1) for one or more received SSS"""
+        sss_I, sss_Q = self._signs(data_in)
+        num_SSS = sss_I.shape[0]
+        # one matrix product for the I and Q bits of all received SSS and all N_id
+        acc = np.rint(np.vstack((sss_I, sss_Q)) @ self.sss_T).astype(np.int64)
+        acc_I = acc[:num_SSS]
+        acc_Q = acc[num_SSS:]
+        columns = 3 * np.arange(N_id_1_MAX + 1) + self._N_id_2(N_id_2, num_SSS)[:, None]
+        return np.maximum(np.abs(np.take_along_axis(acc_I, columns, axis = 1)),
+                          np.abs(np.take_along_axis(acc_Q, columns, axis = 1)))
+
+    def detect(self, data_in, N_id_2):
+        """
+        returns m_axis_out_tdata (N_id_1), N_id_o and the best score for one or more received SSS
+
+        The received SSS are processed in order, like consecutive detections of the HDL.
+        """
+        scores = self.scores(data_in, N_id_2)
+        num_SSS = scores.shape[0]
+        N_id_2 = self._N_id_2(N_id_2, num_SSS)
+        best = np.argmax(scores, axis = 1)
+        best_score = scores[np.arange(num_SSS), best]
+        N_id_1 = np.empty(num_SSS, np.int64)
+        N_id = np.empty(num_SSS, np.int64)
+        for i in range(num_SSS):
+            if best_score[i] > 0:
+                self.N_id_1_det = int(best[i])
+                self.N_id_det = 3 * self.N_id_1_det + int(N_id_2[i])
+            N_id_1[i] = self.N_id_1_det
+            N_id[i] = self.N_id_det
+        return N_id_1, N_id, best_score
+
+    def correlate(self, data_in, N_id_2):
+        """|vdot(SSS, data_in)| of all N_id_1 with shape (num_SSS, N_id_1_MAX + 1), using the full complex values"""
+        data = np.atleast_2d(np.asarray(data_in, complex))
+        num_SSS = data.shape[0]
+        corr = data @ self.sss.T.astype(np.float64)
+        columns = 3 * np.arange(N_id_1_MAX + 1) + self._N_id_2(N_id_2, num_SSS)[:, None]
+        return np.abs(np.take_along_axis(corr, columns, axis = 1))
+
+    def _N_id_2(self, N_id_2, num_SSS):
+        return np.broadcast_to(np.asarray(N_id_2, np.int64), (num_SSS,))
+
+    def _signs(self, data_in):
+        # bpsk demodulation, the MSB of the real and imaginary part is 0 for +1
+        data = np.asarray(data_in) if isinstance(data_in, np.ndarray) else np.asarray(data_in, dtype = object)
+        data = np.atleast_2d(data)
+        if np.iscomplexobj(data) or isinstance(data.flat[0], complex):
+            data = data.astype(complex)
+            positive_I = np.real(data) >= 0
+            positive_Q = np.imag(data) >= 0
+        else:
+            data = data.astype(object)
+            positive_I = ((data >> (self.IN_DW // 2 - 1)) & 1) == 0
+            positive_Q = ((data >> (self.IN_DW - 1)) & 1) == 0
+        sss_I = np.where(positive_I[:, :SSS_LEN - 1], 1, -1).astype(np.float32)
+        sss_Q = np.where(positive_Q[:, :SSS_LEN - 1], 1, -1).astype(np.float32)
+        return sss_I, sss_Q
@@ -0,0 +1,19 @@
+import os
+import sys
+import importlib.util
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_model(name):
+    """
+    model/<name>.py, every model is executed once and then shared through sys.modules
+
+    The models are registered as _model_<name>, so generic names like fft or div do not collide with other modules.
+    """
+    module_name = f'_model_{name}'
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(MODEL_DIR, f'{name}.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
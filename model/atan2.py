@@ -0,0 +1,121 @@
+import numpy as np
+import math
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+div = load_model('div')
+
+# atan LUTs, keyed on (INPUT_WIDTH, OUTPUT_WIDTH) of the atan core
+_lut_cache = {}
+
+def atan_lut(INPUT_WIDTH, OUTPUT_WIDTH):
+    """
+    LUT of hdl/atan.sv, the real to integer conversion of the initial block rounds half away from zero
+
+    math.atan is used instead of np.arctan, because it calls the same C library function as $atan.
+    """
+    key = (int(INPUT_WIDTH), int(OUTPUT_WIDTH))
+    if key not in _lut_cache:
+        MAX_LUT_IN_VAL = 2 ** INPUT_WIDTH - 1
+        MAX_LUT_OUT_VAL = 2 ** OUTPUT_WIDTH - 1
+        lut = np.array([int(math.floor(math.atan(i / MAX_LUT_IN_VAL) / (3.14159 / 4) * MAX_LUT_OUT_VAL + 0.5)) & MAX_LUT_OUT_VAL
+                        for i in range(MAX_LUT_IN_VAL + 1)], np.int64)
+        lut.setflags(write = False)
+        _lut_cache[key] = lut
+    return _lut_cache[key]
+
+class Model:
+    """
+    model of atan2
+
+    The output is scaled so that 2 ** (OUTPUT_WIDTH - 1) - 1 is pi. hdl/atan.sv is a plain LUT, there is
+    no CORDIC stage to model. angle() evaluates whole arrays, set_data() and tick() follow the pipeline.
+    """
+    BLOCK_LEN = 2 ** 20  # pairs per vectorized block, limits the size of the temporary arrays
+
+    def __init__(self, INPUT_WIDTH, LUT_DW, OUTPUT_WIDTH):
+        self.INPUT_WIDTH = int(INPUT_WIDTH)
+        self.LUT_DW = int(LUT_DW)
+        self.OUTPUT_WIDTH = int(OUTPUT_WIDTH)
+        self.ATAN_OUT_DW = self.OUTPUT_WIDTH - 3
+        self.PI_HALF = 2 ** (self.OUTPUT_WIDTH - 1) - 1
+        self.PI_QUARTER = 2 ** (self.OUTPUT_WIDTH - 2) - 1
+        self.lut = atan_lut(self.LUT_DW, self.ATAN_OUT_DW)
+        self.div = div.Model(self.INPUT_WIDTH + self.LUT_DW, self.LUT_DW, PIPELINED = 1, USER_WIDTH = 3)
+        # numerator_wide has INPUT_WIDTH + LUT_DW bits
+        self.dtype = np.int64 if self.INPUT_WIDTH + self.LUT_DW <= 62 and self.OUTPUT_WIDTH <= 62 else object
+        # clock cycles from valid_i to valid_o: input stage + pipelined div + atan LUT + quadrant correction + output
+        self.LATENCY = self.div.LATENCY + 4
+        self.reset()
+
+    def angle(self, numerator, denominator):
+        """angle_o for every pair of numerator_i and denominator_i"""
+        numerator = self._to_array(numerator)
+        denominator = self._to_array(denominator)
+        result = np.empty(numerator.shape, self.dtype)
+        for start in range(0, len(numerator), self.BLOCK_LEN):
+            block = slice(start, start + self.BLOCK_LEN)
+            result[block] = self._angle(numerator[block], denominator[block])
+        return result
+
+    def _angle(self, numerator, denominator):
+        numerator = self._wrap(numerator, self.INPUT_WIDTH)
+        denominator = self._wrap(denominator, self.INPUT_WIDTH)
+
+        # stage 0, abs() of the most negative value stays 2 ** (INPUT_WIDTH - 1) as unsigned number
+        abs_num = np.abs(numerator)
+        abs_den = np.abs(denominator)
+        inv_div_result = ~(abs_den > abs_num)
+        num = np.where(inv_div_result, abs_den, abs_num)
+        den = np.where(inv_div_result, abs_num, abs_den)
+        num_wide = np.where(num != 0, (num << self.LUT_DW) - 1, 0)
+
+        # div saturates to all ones, this also happens for 0 / 0
+        div_result = self.div.divide(num_wide, den).astype(np.int64)
+
+        atan_angle = self.lut[div_result].astype(self.dtype)
+        atan2_out = np.where(inv_div_result, self.PI_QUARTER - atan_angle, atan_angle)
+        num_pos = numerator >= 0
+        den_pos = denominator >= 0
+        atan2_out = np.where(num_pos & ~den_pos, self.PI_HALF - atan2_out, atan2_out)
+        atan2_out = np.where(~num_pos & ~den_pos, atan2_out - self.PI_HALF, atan2_out)
+        atan2_out = np.where(~num_pos & den_pos, -atan2_out, atan2_out)
+        return self._wrap(atan2_out, self.OUTPUT_WIDTH)
+
+    def tick(self):
+        self.valid[1:] = self.valid[:-1]
+        self.result[1:] = self.result[:-1]
+        self.valid[0] = False
+        if self.in_buffer is not None:
+            self.result[0] = self.angle([self.in_buffer[0]], [self.in_buffer[1]])[0]
+            self.valid[0] = True
+            self.in_buffer = None
+
+    def set_data(self, numerator, denominator):
+        self.in_buffer = (numerator, denominator)
+
+    def reset(self):
+        self.in_buffer = None
+        self.valid = np.zeros(self.LATENCY, bool)
+        self.result = np.zeros(self.LATENCY, self.dtype)
+
+    def data_valid(self):
+        return self.valid[-1]
+
+    def get_data(self):
+        return self.result[-1]
+
+    def _to_array(self, val):
+        val = np.asarray(val) if isinstance(val, np.ndarray) else np.asarray(val, dtype = object)
+        return val.astype(self.dtype).reshape(-1)
+
+    def _wrap(self, val, bits):
+        val = val & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val).astype(self.dtype)
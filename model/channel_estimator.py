@@ -0,0 +1,275 @@
+import numpy as np
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+atan2 = load_model('atan2')
+complex_multiplier = load_model('complex_multiplier')
+lfsr = load_model('lfsr')
+dds = load_model('dds')
+
+N_id_MAX = 1007
+NUM_PBCH_DMRS_TYPES = 8
+PBCH_DMRS_LEN = 144
+SYMBOL_LEN = 240
+SYMS_PER_PBCH = 3
+
+# the table is also kept on disk in model/.cache, so that it is only generated once
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'PBCH_DMRS_table.npy')
+
+# PBCH DMRS of all N_id and ibar_SSB, shape (N_id_MAX + 1, NUM_PBCH_DMRS_TYPES, PBCH_DMRS_LEN), loaded on first use
+_dmrs_table = None
+
+def c_init(N_id, ibar_SSB):
+    """c_init of the PBCH DMRS from 38.211 7.4.1.4.1, like the c_init registers of the LFSR_1 instances"""
+    N_id = np.asarray(N_id, np.int64)
+    ibar_SSB = np.asarray(ibar_SSB, np.int64)
+    return (((ibar_SSB + 1) * ((N_id >> 2) + 1)) << 11) + ((ibar_SSB + 1) << 6) + (N_id % 4)
+
+def dmrs_table():
+    """
+    returns a read-only uint8 table with the PBCH DMRS of N_id and ibar_SSB in row [N_id, ibar_SSB]
+
+    Every entry has the format of PBCH_DMRS in the HDL, bit 1 is c(2m) (real part) and bit 0 is c(2m + 1) (imaginary part).
+    A set bit stands for -1 / sqrt(2).
+    """
+    global _dmrs_table
+    if _dmrs_table is None:
+        shape = (N_id_MAX + 1, NUM_PBCH_DMRS_TYPES, PBCH_DMRS_LEN)
+        table = None
+        if os.path.exists(CACHE_FILE):
+            try:
+                table = np.load(CACHE_FILE)
+            except (OSError, ValueError):
+                table = None
+            if table is not None and (table.shape != shape or table.dtype != np.uint8):
+                table = None
+        if table is None:
+            N_id, ibar_SSB = np.meshgrid(np.arange(N_id_MAX + 1), np.arange(NUM_PBCH_DMRS_TYPES), indexing = 'ij')
+            c = lfsr.gold_sequence(c_init(N_id.ravel(), ibar_SSB.ravel()), 2 * PBCH_DMRS_LEN)
+            table = ((c[:, 0::2] << 1) | c[:, 1::2]).reshape(shape)
+            try:
+                os.makedirs(os.path.dirname(CACHE_FILE), exist_ok = True)
+                np.save(CACHE_FILE, table)
+            except OSError:
+                pass
+        table.setflags(write = False)
+        _dmrs_table = table
+    return _dmrs_table
+
+class Model:
+    """
+    model of channel_estimator
+
+    The first symbol of every PBCH burst is hard demodulated and correlated with the PBCH DMRS of all 8 ibar_SSB,
+    once as it is and once rotated by 90 degrees. The first ibar_SSB with the highest absolute correlation wins.
+    Like in the HDL, the rotated correlations are not cleared between bursts.
+    Every pilot gives a correction factor DDS(-(angle(received) - angle(pilot))), which is applied to the next
+    3 data subcarriers in output order (piecewise constant interpolation). Symbols which are not part of a PBCH
+    burst are passed through with a correction angle of 0, their pilot positions are dropped as well.
+
+    For N_id % 4 == 3 the HDL skips the pilot at subcarrier 47 of the 2nd PBCH symbol and does not set tlast,
+    the model does the same, correction factors and data are paired as a continuous stream across calls.
+    The DDS is modeled by model/dds.py with LUT_DW = PHASE_DW - 2 and without taylor correction. Cycle timing
+    of the FIFOs is not modeled.
+    """
+    PHASE_DW = 12
+    LUT_DW = 14
+    DDS_OUT_DW = 32
+    MAX_PHASE = 2 ** (PHASE_DW - 1) - 1
+    DEG45 = MAX_PHASE // 4
+    DEG135 = 3 * DEG45
+    CORR_DW = 9  # DMRS_corr and DMRS_corr_rot are signed [$clog2(60 * 2) + 1 : 0]
+
+    def __init__(self, IN_DW, BLK_EXP_LEN = 8):
+        self.IN_DW = int(IN_DW)
+        self.BLK_EXP_LEN = int(BLK_EXP_LEN)
+        self.atan2 = atan2.Model(self.IN_DW // 2, self.LUT_DW, self.PHASE_DW)
+        self.multiplier = complex_multiplier.Model(self.DDS_OUT_DW // 2, self.IN_DW // 2, self.IN_DW // 2, GROWTH_BITS = -2)
+        self.DDS = dds.Model(self.PHASE_DW, self.DDS_OUT_DW // 2)
+        # angle of the pilots 2'b00, 2'b01, 2'b10 and 2'b11
+        self.pilot_angles = np.array([self.DEG45, -self.DEG45, self.DEG135, -self.DEG135], np.int64)
+        self.N_id = None
+        self.reset()
+
+    def reset(self):
+        """reset, the N_id is kept like the PBCH_DMRS registers"""
+        self.DMRS_corr_rot = np.zeros(NUM_PBCH_DMRS_TYPES, np.int64)
+        self.ibar_SSB_detected = 0
+        self._factors = np.zeros((2, 0), np.int64)
+        self._data = np.zeros((2, 0), np.int64)
+        self._user = np.zeros(0, np.int64)
+        self._last = np.zeros(0, bool)
+        self._div3 = 0
+
+    def set_N_id(self, N_id):
+        """like N_id_i with N_id_valid_i"""
+        self.N_id = int(N_id)
+
+    def pilots(self, ibar_SSB = None):
+        """PBCH_DMRS of the current N_id, all 8 ibar_SSB or only the given ones"""
+        dmrs = dmrs_table()[self.N_id]
+        return dmrs if ibar_SSB is None else dmrs[ibar_SSB]
+
+    def detect_ibar(self, symbols):
+        """
+        returns debug_ibar_SSB_o, the correlations and the rotated correlations for the first symbol of every PBCH burst
+
+        symbols has shape (num_PBCH, SYMBOL_LEN). Only the first SYMBOL_LEN - 1 subcarriers are compared.
+        """
+        return self._detect_ibar(*self._unpack(symbols))
+
+    def _detect_ibar(self, re, im):
+        num_PBCH = re.shape[0]
+        start_idx = self.N_id % 4
+        SC = np.arange(start_idx, SYMBOL_LEN - 1, 4)
+        # the MSBs, 1 for negative values
+        re_neg = (re[:, SC] < 0).astype(np.int64)
+        im_neg = (im[:, SC] < 0).astype(np.int64)
+        dmrs = self.pilots()[:, :len(SC)].astype(np.int64)
+        # +1 for equal bits and -1 for different bits
+        dmrs_pm = np.concatenate((1 - 2 * (dmrs >> 1), 1 - 2 * (dmrs & 1)), axis = 1)
+        demod = np.concatenate((1 - 2 * re_neg, 1 - 2 * im_neg), axis = 1)
+        demod_rot = np.concatenate((1 - 2 * (1 - im_neg), 1 - 2 * re_neg), axis = 1)
+        corr = self._wrap(demod @ dmrs_pm.T, self.CORR_DW)
+        corr_rot = self._wrap(self.DMRS_corr_rot + np.cumsum(demod_rot @ dmrs_pm.T, axis = 0), self.CORR_DW)
+        if num_PBCH:
+            self.DMRS_corr_rot = corr_rot[-1].copy()
+
+        # abs_DMRS_corr() discards the MSB
+        mask = 2 ** (self.CORR_DW - 1) - 1
+        score = np.maximum(np.abs(corr) & mask, np.abs(corr_rot) & mask)
+        # ibar_SSB_detected only changes for a strictly higher score, it is 0 if all scores are 0
+        ibar_SSB = np.argmax(score, axis = 1)
+        if num_PBCH:
+            self.ibar_SSB_detected = int(ibar_SSB[-1])
+        return ibar_SSB, corr, corr_rot
+
+    def process(self, symbols, tuser):
+        """
+        returns re and im of m_axis_out_tdata, m_axis_out_tuser and m_axis_out_tlast
+
+        symbols has shape (num_symbols, SYMBOL_LEN), tuser is s_axis_in_tuser of the first subcarrier of every symbol.
+        A symbol with tuser bit 0 set starts a PBCH burst of SYMS_PER_PBCH symbols. Data that still waits for
+        its correction factor is returned by the next call.
+        """
+        re, im = self._unpack(symbols)
+        tuser = np.broadcast_to(np.asarray(tuser, np.int64), (re.shape[0],))
+        start_idx = 0 if self.N_id is None else self.N_id % 4
+
+        # split the symbols into PBCH bursts and single pass through symbols
+        bursts = []
+        sym = 0
+        while sym < re.shape[0]:
+            if (tuser[sym] & 1) and self.N_id is not None:
+                if sym + SYMS_PER_PBCH > re.shape[0]:
+                    raise ValueError('incomplete PBCH burst')
+                bursts.append((sym, True))
+                sym += SYMS_PER_PBCH
+            else:
+                bursts.append((sym, False))
+                sym += 1
+
+        PBCH_start = np.array([sym for sym, is_PBCH in bursts if is_PBCH], np.int64)
+        corr_angle = None
+        if len(PBCH_start):
+            ibar_SSB, _, _ = self._detect_ibar(re[PBCH_start], im[PBCH_start])
+            corr_angle = self.correction_angles(re, im, PBCH_start, ibar_SSB)
+
+        _, data_mask = self.masks(start_idx)
+        pass_pilots = (np.arange(SYMBOL_LEN) - start_idx) % 4 == 0
+        cos0, sin0 = self.dds(np.zeros(1, np.int64))
+        factors = [self._factors]
+        data = [self._data]
+        user = [self._user]
+        last = [self._last]
+        PBCH_cnt = 0
+        for sym, is_PBCH in bursts:
+            if is_PBCH:
+                cos, sin = self.dds(corr_angle[PBCH_cnt])
+                factors.append(np.vstack((cos, sin)))
+                burst_re = re[sym:sym + SYMS_PER_PBCH][data_mask]
+                burst_im = im[sym:sym + SYMS_PER_PBCH][data_mask]
+                data.append(np.vstack((burst_re, burst_im)))
+                burst_user = self._out_user(tuser[sym:sym + SYMS_PER_PBCH], 1, data_mask)
+                user.append(burst_user)
+                burst_last = np.zeros(len(burst_re), bool)
+                # tlast is written together with subcarrier SYMBOL_LEN - 1, which is lost if it is a pilot
+                if data_mask[-1, -1]:
+                    burst_last[-1] = True
+                last.append(burst_last)
+                PBCH_cnt += 1
+            else:
+                num_pilots = np.count_nonzero(pass_pilots)
+                factors.append(np.vstack((np.full(num_pilots, cos0[0]), np.full(num_pilots, sin0[0]))))
+                data.append(np.vstack((re[sym][~pass_pilots], im[sym][~pass_pilots])))
+                user.append(self._out_user(tuser[sym:sym + 1], 0, ~pass_pilots[None, :]))
+                last.append(np.zeros(np.count_nonzero(~pass_pilots), bool))
+
+        factors = np.concatenate(factors, axis = 1)
+        data = np.concatenate(data, axis = 1)
+        user = np.concatenate(user)
+        last = np.concatenate(last)
+
+        # every correction factor is used for 3 data subcarriers, the rest waits for the next factor
+        num_out = min(data.shape[1], 3 * factors.shape[1] - self._div3)
+        idx = (self._div3 + np.arange(num_out)) // 3
+        out_re, out_im = self.multiplier.multiply(factors[0, idx], factors[1, idx], data[0, :num_out], data[1, :num_out])
+        self._factors = factors[:, (self._div3 + num_out) // 3:]
+        self._div3 = (self._div3 + num_out) % 3
+        self._data = data[:, num_out:]
+        self._user = user[num_out:]
+        self._last = last[num_out:]
+        return out_re, out_im, user[:num_out], last[:num_out]
+
+    def correction_angles(self, re, im, PBCH_start, ibar_SSB):
+        """corr_angle_DDS_in of all used pilots of every PBCH burst with shape (num_PBCH, num_pilots)"""
+        pilot_mask, _ = self.masks(self.N_id % 4)
+        burst = PBCH_start[:, None] + np.arange(SYMS_PER_PBCH)
+        pilot_re = re[burst][:, pilot_mask]
+        pilot_im = im[burst][:, pilot_mask]
+        angle = self.atan2.angle(pilot_im.ravel(), pilot_re.ravel()).astype(np.int64).reshape(pilot_re.shape)
+        num_pilots = pilot_re.shape[1]
+        pilot = self.pilots()[ibar_SSB][:, :num_pilots]
+        return self._wrap(-(angle - self.pilot_angles[pilot]), self.PHASE_DW)
+
+    def masks(self, start_idx):
+        """pilot and data subcarriers of a PBCH burst with shape (SYMS_PER_PBCH, SYMBOL_LEN)"""
+        SC = np.arange(SYMBOL_LEN)
+        pilot = np.broadcast_to((SC - start_idx) % 4 == 0, (SYMS_PER_PBCH, SYMBOL_LEN)).copy()
+        data = ~pilot
+        # the SSS is in the middle of the 2nd symbol, the range for pilots starts one subcarrier earlier
+        pilot[1, 47:192] = False
+        data[1, 48:192] = False
+        return pilot, data
+
+    def dds(self, phase):
+        """cos and sin of the DDS for every phase, scaled to DDS_OUT_DW / 2 bits"""
+        return self.DDS.dds(phase)
+
+    def _out_user(self, tuser, symbol_type, mask):
+        # {in_fifo_user[BLK_EXP_LEN : 1], symbol_type} of every output sample
+        BLK_EXP = (tuser >> 1) & (2 ** self.BLK_EXP_LEN - 1)
+        user = (BLK_EXP[:, None] << 2) + symbol_type
+        return np.broadcast_to(user, mask.shape)[mask]
+
+    def _unpack(self, symbols):
+        half = self.IN_DW // 2
+        symbols = np.asarray(symbols) if isinstance(symbols, np.ndarray) else np.asarray(symbols, dtype = object)
+        symbols = np.atleast_2d(symbols)
+        if np.iscomplexobj(symbols) or (symbols.size and isinstance(symbols.flat[0], complex)):
+            symbols = symbols.astype(complex)
+            return self._wrap(np.real(symbols).astype(np.int64), half), self._wrap(np.imag(symbols).astype(np.int64), half)
+        symbols = symbols.astype(object)
+        return self._wrap((symbols & (2 ** half - 1)).astype(np.int64), half), \
+            self._wrap(((symbols >> half) & (2 ** half - 1)).astype(np.int64), half)
+
+    def _wrap(self, val, bits):
+        val = np.asarray(val, np.int64) & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val)
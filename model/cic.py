@@ -0,0 +1,78 @@
+import numpy as np
+
+class Model:
+    """
+    model of cic_d with VAR_RATE = 0
+
+    The CIC submodule is not part of this repository, this model assumes the classic structure without pruning:
+    CIC_N integrators with INP_DW + CIC_N * ceil(log2(CIC_R * CIC_M)) bits that wrap around, a downsampler that
+    outputs every CIC_R-th integrator value starting with input number CIC_R - 1, CIC_N combs with a differential
+    delay of CIC_M and OUT_DW MSBs of the last comb as output.
+
+    Because the arithmetic wraps around, every stage is computed on a whole chunk at once with cumsum and diff.
+    The integrator and comb states and the downsampler phase are carried from one call of process() to the next,
+    so a long capture can be decimated in chunks with the same result as in one piece.
+    """
+    def __init__(self, INP_DW, OUT_DW, CIC_R, CIC_N, CIC_M = 1):
+        self.INP_DW = int(INP_DW)
+        self.OUT_DW = int(OUT_DW)
+        self.CIC_R = int(CIC_R)
+        self.CIC_N = int(CIC_N)
+        self.CIC_M = int(CIC_M)
+        self.BIT_GROWTH = self.CIC_N * int(np.ceil(np.log2(self.CIC_R * self.CIC_M)))
+        self.REG_DW = self.INP_DW + self.BIT_GROWTH
+        assert self.REG_DW <= 63, 'integrators have to fit into int64'
+        assert self.OUT_DW <= self.REG_DW, 'OUT_DW > INP_DW + bit growth is not supported'
+        self.mask = np.int64(2 ** self.REG_DW - 1)
+        self.reset()
+
+    def reset(self):
+        """clear all integrators and combs like reset_n"""
+        self.integrators = None
+        self.combs = None
+        self.phase = 0
+
+    def process(self, data):
+        """
+        returns m_axis_out_tdata for a chunk of s_axis_in_tdata
+
+        data are signed integers, complex integers are decimated like cic_real and cic_imag in hdl/PSS_detector.sv.
+        All chunks of a stream have to be either real or complex.
+        """
+        data = np.asarray(data)
+        is_complex = np.iscomplexobj(data)
+        channels = np.stack((data.real, data.imag)) if is_complex else data[None, :]
+        channels = self._wrap(np.asarray(channels, np.int64), self.INP_DW)
+        if self.integrators is None:
+            self.integrators = np.zeros((len(channels), self.CIC_N), np.int64)
+            self.combs = np.zeros((len(channels), self.CIC_N, self.CIC_M), np.int64)
+        assert len(channels) == len(self.integrators), 'a stream has to be either real or complex'
+
+        # int64 wraps around like the integrators, only the REG_DW LSBs are used
+        val = channels
+        for stage in range(self.CIC_N):
+            val = np.cumsum(val, axis = 1) + self.integrators[:, stage, None]
+            if val.shape[1]:
+                self.integrators[:, stage] = val[:, -1] & self.mask
+            val &= self.mask
+
+        first = (self.CIC_R - 1 - self.phase) % self.CIC_R
+        self.phase = (self.phase + channels.shape[1]) % self.CIC_R
+        val = val[:, first::self.CIC_R]
+
+        for stage in range(self.CIC_N):
+            delayed = np.concatenate((self.combs[:, stage], val), axis = 1)
+            self.combs[:, stage] = delayed[:, delayed.shape[1] - self.CIC_M:]
+            val = (val - delayed[:, :val.shape[1]]) & self.mask
+
+        out = self._wrap(val, self.REG_DW) >> (self.REG_DW - self.OUT_DW)
+        return out[0] + 1j * out[1] if is_complex else out[0]
+
+    def decimate(self, data):
+        """process() of a whole stream from reset"""
+        self.reset()
+        return self.process(data)
+
+    def _wrap(self, val, bits):
+        val = val & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val)
@@ -0,0 +1,35 @@
+import numpy as np
+
+class Model:
+    """
+    model of complex_multiplier with BYTE_ALIGNED = 0
+
+    The complex_multiplier submodule is not part of this repository, this model assumes that the full precision
+    products with OPERAND_WIDTH_A + OPERAND_WIDTH_B + 1 bits are truncated to their OPERAND_WIDTH_OUT MSBs.
+    With OPERAND_WIDTH_OUT = OPERAND_WIDTH_A + OPERAND_WIDTH_B + 1 (full bit growth) the result is exact.
+    A negative GROWTH_BITS moves the output window down by that many bits, the MSBs that are dropped wrap around.
+    """
+    def __init__(self, OPERAND_WIDTH_A, OPERAND_WIDTH_B, OPERAND_WIDTH_OUT, GROWTH_BITS = 0):
+        self.OPERAND_WIDTH_A = int(OPERAND_WIDTH_A)
+        self.OPERAND_WIDTH_B = int(OPERAND_WIDTH_B)
+        self.OPERAND_WIDTH_OUT = int(OPERAND_WIDTH_OUT)
+        self.GROWTH_BITS = int(GROWTH_BITS)
+        self.FULL_DW = self.OPERAND_WIDTH_A + self.OPERAND_WIDTH_B + 1
+        self.dtype = np.int64 if self.FULL_DW <= 62 else object
+
+    def multiply(self, a_re, a_im, b_re, b_im):
+        """returns re and im of m_axis_dout_tdata for every pair of operands"""
+        a_re, a_im, b_re, b_im = (np.asarray(val).astype(self.dtype) for val in (a_re, a_im, b_re, b_im))
+        out_re = a_re * b_re - a_im * b_im
+        out_im = a_re * b_im + a_im * b_re
+        shift = max(self.FULL_DW - self.OPERAND_WIDTH_OUT + self.GROWTH_BITS, 0)
+        return self._wrap(out_re >> shift), self._wrap(out_im >> shift)
+
+    def pack(self, out_re, out_im):
+        """pack re and im into {im, re} words like m_axis_dout_tdata"""
+        mask = 2 ** self.OPERAND_WIDTH_OUT - 1
+        return [((int(im) & mask) << self.OPERAND_WIDTH_OUT) + (int(re) & mask) for re, im in zip(out_re, out_im)]
+
+    def _wrap(self, val):
+        val = val & (2 ** self.OPERAND_WIDTH_OUT - 1)
+        return np.where(val >= 2 ** (self.OPERAND_WIDTH_OUT - 1), val - 2 ** self.OPERAND_WIDTH_OUT, val).astype(self.dtype)
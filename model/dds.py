@@ -0,0 +1,156 @@
+import numpy as np
+import hashlib
+import importlib.util
+import os
+import sys
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(os.path.dirname(os.path.abspath(__file__)), '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+complex_multiplier = load_model('complex_multiplier')
+
+# parsed LUT files are kept on disk in model/.cache, like the PBCH DMRS table of channel_estimator
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+TAYLOR_FRAC_BITS = 16  # fractional bits of 2 pi for the taylor correction
+
+_luts = {}
+
+def load_lut(file_name):
+    """
+    values of a $readmemh file with @address lines as read-only int64 array
+
+    The values are parsed once and stored as .npy in CACHE_DIR, later calls use a memory map of that file as long
+    as it is newer than the hex file. The cache file name contains a hash of the absolute path, so that LUT files
+    with the same name in different folders do not share a cache file.
+    """
+    file_name = os.path.abspath(file_name)
+    if file_name not in _luts:
+        path_hash = hashlib.md5(file_name.encode()).hexdigest()[:16]
+        cache_file = os.path.join(CACHE_DIR, f'{os.path.splitext(os.path.basename(file_name))[0]}_{path_hash}.npy')
+        if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(file_name):
+            _luts[file_name] = np.load(cache_file, mmap_mode = 'r')
+        else:
+            with open(file_name) as f:
+                words = [word for word in f.read().split() if not word.startswith('@')]
+            lut = np.array([int(word, 16) for word in words], np.int64)
+            try:
+                os.makedirs(CACHE_DIR, exist_ok = True)
+                np.save(cache_file, lut)
+            except OSError:
+                pass  # read-only checkout, parse the hex file every time
+            lut.setflags(write = False)
+            _luts[file_name] = lut
+    return _luts[file_name]
+
+class Model:
+    """
+    model of dds with SIN_COS = 1
+
+    The DDS submodule is not part of this repository. This model uses a quarter wave LUT with 2 ** LUT_DW entries
+    round(sin(pi / 2 * i / 2 ** LUT_DW) * (2 ** (OUT_DW - 1) - 1)), like tests/sine_lut_16_16.hex, addressed by the
+    LUT_DW bits below the 2 quadrant bits of the phase. The other quadrants are mirrored, so that the outputs are
+    round(sin(2 pi phase / 2 ** PHASE_DW) * amplitude) for phases that hit the LUT exactly. With USE_TAYLOR the
+    remaining phase LSBs r add the truncated first order correction cos * r * 2 pi / 2 ** PHASE_DW to sin and
+    subtract sin * r * 2 pi / 2 ** PHASE_DW from cos. m_axis_out_tdata is {sin, cos}, i.e. exp(1j * phase).
+
+    generate() models the phase accumulator in front of the DDS, as in hdl/test_CFO_correction.sv and
+    hdl/receiver.sv: sample n uses the accumulated increments of all samples before it, the phase register
+    is carried from one call to the next.
+    """
+    def __init__(self, PHASE_DW, OUT_DW, USE_TAYLOR = 0, LUT_DW = None, NEGATIVE_SINE = 0, NEGATIVE_COSINE = 0, LUT_FILE = ''):
+        self.PHASE_DW = int(PHASE_DW)
+        self.OUT_DW = int(OUT_DW)
+        self.USE_TAYLOR = int(USE_TAYLOR)
+        self.LUT_DW = self.PHASE_DW - 2 if LUT_DW is None else int(LUT_DW)
+        self.NEGATIVE_SINE = int(NEGATIVE_SINE)
+        self.NEGATIVE_COSINE = int(NEGATIVE_COSINE)
+        self.LUT_FILE = LUT_FILE
+        assert self.LUT_DW <= self.PHASE_DW - 2, 'LUT_DW > PHASE_DW - 2 is not supported'
+        self.RESIDUAL_DW = self.PHASE_DW - 2 - self.LUT_DW
+        self.amplitude = 2 ** (self.OUT_DW - 1) - 1
+        if self.LUT_FILE != '':
+            lut = load_lut(self.LUT_FILE)
+            assert len(lut) == 2 ** self.LUT_DW, f'{self.LUT_FILE} does not have 2 ** LUT_DW entries'
+        else:
+            lut = np.round(np.sin(np.pi / 2 * np.arange(2 ** self.LUT_DW) / 2 ** self.LUT_DW) * self.amplitude)
+        # the value at pi / 2 is needed for the mirrored quadrants
+        self.lut = np.append(np.asarray(lut, np.int64), self.amplitude)
+        self.lut.setflags(write = False)
+        self.reset()
+
+    def reset(self):
+        """clear the phase register"""
+        self.phase = 0
+
+    def dds(self, phase):
+        """returns cos and sin of m_axis_out_tdata for every phase"""
+        phase = np.asarray(phase, np.int64) & (2 ** self.PHASE_DW - 1)
+        quadrant = phase >> (self.PHASE_DW - 2)
+        addr = (phase >> self.RESIDUAL_DW) & (2 ** self.LUT_DW - 1)
+        first = self.lut[addr]
+        second = self.lut[2 ** self.LUT_DW - addr]
+        sin = np.where(quadrant & 1, second, first)
+        cos = np.where(quadrant & 1, first, second)
+        sin = np.where(quadrant >= 2, -sin, sin)
+        cos = np.where((quadrant == 1) | (quadrant == 2), -cos, cos)
+        if self.USE_TAYLOR and self.RESIDUAL_DW:
+            residual = phase & (2 ** self.RESIDUAL_DW - 1)
+            two_pi = int(round(2 * np.pi * 2 ** TAYLOR_FRAC_BITS))
+            shift = self.PHASE_DW + TAYLOR_FRAC_BITS
+            sin, cos = sin + ((cos * residual * two_pi) >> shift), cos - ((sin * residual * two_pi) >> shift)
+        sin = -sin if self.NEGATIVE_SINE else sin
+        cos = -cos if self.NEGATIVE_COSINE else cos
+        return cos, sin
+
+    def phases(self, num, inc, updates = None):
+        """
+        s_axis_phase_tdata for num samples with phase increment inc
+
+        updates is a list of (sample index, increment) pairs, the new increment is used from that sample on.
+        """
+        if num == 0:
+            return np.zeros(0, np.int64)
+        starts = [0]
+        values = [int(inc)]
+        for idx, value in sorted(updates or []):
+            starts.append(int(idx))
+            values.append(int(value))
+        lengths = np.diff(np.append(np.clip(starts, 0, num), num))
+        increments = np.repeat(np.array(values, np.int64) & (2 ** self.PHASE_DW - 1), lengths)
+        accumulated = np.cumsum(increments) & (2 ** self.PHASE_DW - 1)
+        phases = (np.concatenate(([0], accumulated[:-1])) + self.phase) & (2 ** self.PHASE_DW - 1)
+        self.phase = int((accumulated[-1] + self.phase) & (2 ** self.PHASE_DW - 1))
+        return phases
+
+    def generate(self, num, inc, updates = None):
+        """cos and sin for num samples of the phase accumulator, see phases()"""
+        return self.dds(self.phases(num, inc, updates))
+
+    def mix(self, data, IN_DW, MULT_OUT_DW, inc, updates = None, GROWTH_BITS = -2):
+        """
+        returns re and im of the complex_multiplier output for data rotated by the DDS
+
+        data are complex integers or packed {im, re} words with IN_DW bits, MULT_OUT_DW is COMPL_MULT_OUT_DW.
+        """
+        half = int(IN_DW) // 2
+        data_re, data_im = self._unpack(data, half)
+        cos, sin = self.generate(len(data_re), inc, updates)
+        multiplier = complex_multiplier.Model(self.OUT_DW, half, int(MULT_OUT_DW) // 2, GROWTH_BITS = GROWTH_BITS)
+        return multiplier.multiply(cos, sin, data_re, data_im)
+
+    def _unpack(self, data, half):
+        data = np.asarray(data) if isinstance(data, np.ndarray) else np.asarray(data, dtype = object)
+        data = data.reshape(-1)
+        if np.iscomplexobj(data) or (len(data) and isinstance(data[0], complex)):
+            data = data.astype(complex)
+            return np.real(data).astype(np.int64), np.imag(data).astype(np.int64)
+        data = data.astype(object)
+        return self._wrap((data & (2 ** half - 1)).astype(np.int64), half), \
+            self._wrap(((data >> half) & (2 ** half - 1)).astype(np.int64), half)
+
+    def _wrap(self, val, bits):
+        val = val & (2 ** bits - 1)
+        return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val)
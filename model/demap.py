@@ -0,0 +1,53 @@
+import numpy as np
+
+class Model:
+    """
+    model of demap
+
+    Only QPSK is supported. The LLRs of I and Q are the LLR_DW MSBs of the IQ_DW bit components, which is an
+    arithmetic right shift. It rounds towards -inf and cannot saturate, because the MSBs keep the sign.
+    Only samples with tuser == 1 (PBCH) are demapped, every sample gives the LLR of I followed by the LLR of Q,
+    both with the tuser of the sample. tlast is the one of the sample on the LLR of Q, axis_fifo_asym does not
+    forward it yet, so m_axis_out_tlast is not driven in the HDL.
+    """
+    def __init__(self, IQ_DW, LLR_DW):
+        self.IQ_DW = int(IQ_DW)
+        self.LLR_DW = int(LLR_DW)
+        # for LLR_DW > IQ_DW the part select of llr_Q in the HDL is out of range
+        assert self.LLR_DW <= self.IQ_DW, 'LLR_DW > IQ_DW is not supported'
+
+    def llr(self, data):
+        """returns the LLRs of I and Q for every sample, data are packed {Q, I} words or complex integers"""
+        I, Q = self._unpack(data)
+        shift = self.IQ_DW - self.LLR_DW
+        return I >> shift, Q >> shift
+
+    def demap(self, data, tuser = 1, tlast = 0):
+        """
+        returns m_axis_out_tdata as signed integers, m_axis_out_tuser and m_axis_out_tlast for a stream of samples
+
+        tuser and tlast are s_axis_in_tuser and s_axis_in_tlast, either per sample or one value for all samples.
+        """
+        llr_I, llr_Q = self.llr(data)
+        num = len(llr_I)
+        tuser = np.broadcast_to(np.asarray(tuser, np.int64) & 3, (num,))
+        tlast = np.broadcast_to(np.asarray(tlast, bool), (num,))
+        used = tuser == 1
+        llr = np.column_stack((llr_I[used], llr_Q[used])).reshape(-1)
+        user = np.repeat(tuser[used], 2)
+        last = np.column_stack((np.zeros(np.count_nonzero(used), bool), tlast[used])).reshape(-1)
+        return llr, user, last
+
+    def _unpack(self, data):
+        data = np.asarray(data) if isinstance(data, np.ndarray) else np.asarray(data, dtype = object)
+        data = data.reshape(-1)
+        if np.iscomplexobj(data) or (len(data) and isinstance(data[0], complex)):
+            data = data.astype(complex)
+            return self._wrap(np.real(data).astype(np.int64)), self._wrap(np.imag(data).astype(np.int64))
+        data = data.astype(object)
+        mask = 2 ** self.IQ_DW - 1
+        return self._wrap((data & mask).astype(np.int64)), self._wrap(((data >> self.IQ_DW) & mask).astype(np.int64))
+
+    def _wrap(self, val):
+        val = val & (2 ** self.IQ_DW - 1)
+        return np.where(val >= 2 ** (self.IQ_DW - 1), val - 2 ** self.IQ_DW, val)
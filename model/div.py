@@ -0,0 +1,73 @@
+import numpy as np
+
+class Model:
+    """
+    model of div
+
+    Both implementations compute one result bit per stage or clock cycle, results that do not fit into
+    RESULT_WIDTH bits saturate to all ones. A denominator of 0 gives all ones with PIPELINED = 1,
+    the iterative version returns 0 if the numerator or the denominator is 0.
+    """
+    def __init__(self, INPUT_WIDTH, RESULT_WIDTH, PIPELINED = 0, USER_WIDTH = 1):
+        self.INPUT_WIDTH = int(INPUT_WIDTH)
+        self.RESULT_WIDTH = int(RESULT_WIDTH)
+        self.PIPELINED = int(PIPELINED)
+        self.USER_WIDTH = int(USER_WIDTH)
+        # clock cycles from the rising edge that samples valid_i to the one that sets valid_o
+        self.LATENCY = self.RESULT_WIDTH
+        self.dtype = np.uint64 if self.INPUT_WIDTH <= 64 and self.RESULT_WIDTH <= 64 else object
+
+    def divide(self, numerator, denominator):
+        """result_o for every pair of numerator_i and denominator_i"""
+        numerator = self._to_array(numerator, self.INPUT_WIDTH)
+        denominator = self._to_array(denominator, self.INPUT_WIDTH)
+        const = np.uint64 if self.dtype is np.uint64 else int
+        max_result = const(2 ** self.RESULT_WIDTH - 1)
+        nonzero = denominator != 0
+        result = np.full(numerator.shape, max_result, self.dtype)
+        result[nonzero] = np.minimum(numerator[nonzero] // denominator[nonzero], max_result)
+        if not self.PIPELINED:
+            result[(numerator == 0) | ~nonzero] = 0
+        return result
+
+    def busy_cycles(self, numerator, denominator):
+        """
+        clock cycles after which the next valid_i is accepted
+
+        The pipelined version accepts one operation per clock cycle. The iterative version ignores valid_i
+        while it is calculating, which takes RESULT_WIDTH + 1 cycles unless an operand is 0.
+        """
+        numerator = self._to_array(numerator, self.INPUT_WIDTH)
+        denominator = self._to_array(denominator, self.INPUT_WIDTH)
+        if self.PIPELINED:
+            return np.ones(numerator.shape, np.int64)
+        return np.where((numerator == 0) | (denominator == 0), 1, self.RESULT_WIDTH + 1).astype(np.int64)
+
+    def output_cycles(self, numerator, denominator, input_cycles = None):
+        """
+        clock cycles at which valid_o is high and which inputs were accepted, for inputs with valid_i at input_cycles
+
+        input_cycles default to the fastest possible schedule, i.e. the cumulative sum of busy_cycles().
+        """
+        busy = self.busy_cycles(numerator, denominator)
+        if input_cycles is None:
+            input_cycles = np.concatenate(([0], np.cumsum(busy)[:-1]))
+        input_cycles = np.asarray(input_cycles, np.int64)
+        if self.PIPELINED:
+            return input_cycles + self.LATENCY, np.ones(len(input_cycles), bool)
+
+        accepted = np.zeros(len(input_cycles), bool)
+        out_cycles = []
+        free_cycle = input_cycles[0] if len(input_cycles) else 0
+        for i, cycle in enumerate(input_cycles):
+            if cycle >= free_cycle:
+                accepted[i] = True
+                out_cycles.append(cycle if busy[i] == 1 else cycle + self.LATENCY)
+                free_cycle = cycle + busy[i]
+        return np.array(out_cycles, np.int64), accepted
+
+    def _to_array(self, val, bits):
+        val = np.asarray(val) if isinstance(val, np.ndarray) else np.asarray(val, dtype = object)
+        if self.dtype is np.uint64:
+            return val.astype(np.uint64).reshape(-1) & np.uint64(2 ** bits - 1)
+        return val.astype(object).reshape(-1) & (2 ** bits - 1)
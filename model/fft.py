@@ -0,0 +1,88 @@
+import numpy as np
+
+class Model:
+    """
+    model of the FFT submodule (int_fftNk with dynamic_block_scaling)
+
+    The FFT submodule is not part of this repository, this model follows the structure of int_fftNk: NFFT radix-2
+    decimation in frequency stages (int_dif2_fly), a bit reversal buffer and optionally the swap of both halves
+    (SHIFTED) and dynamic_block_scaling (DBS).
+
+    - rom_twiddle_int: W(k) = exp(-2j pi k / 2 ** NFFT) rounded to the nearest integer with an amplitude of
+      2 ** (TWDL_WIDTH - 1) - 1
+    - int_dif2_fly: sum = a + b and diff = a - b, diff is multiplied with the twiddle and the product is truncated
+      by TWDL_WIDTH - 1 bits, W(0) = 1 is a bypass
+    - FORMAT = 1 grows by one bit per stage, FORMAT = 0 truncates every stage by one bit and keeps DATA_WIDTH bits
+    - DBS shifts the whole block to the left by blk_exp, the number of redundant sign bits of its largest component
+    """
+    def __init__(self, NFFT, FORMAT, DATA_WIDTH, TWDL_WIDTH, SHIFTED = 0, DBS = 0):
+        self.NFFT = int(NFFT)
+        self.FORMAT = int(FORMAT)
+        self.DATA_WIDTH = int(DATA_WIDTH)
+        self.TWDL_WIDTH = int(TWDL_WIDTH)
+        self.SHIFTED = int(SHIFTED)
+        self.DBS = int(DBS)
+        self.FFT_LEN = 2 ** self.NFFT
+        self.OUT_WIDTH = self.DATA_WIDTH + self.FORMAT * self.NFFT
+        # int64 has to hold the product of the last stage
+        assert self.OUT_WIDTH + self.TWDL_WIDTH < 63, 'DATA_WIDTH + NFFT + TWDL_WIDTH is too large'
+        amplitude = 2 ** (self.TWDL_WIDTH - 1) - 1
+        angle = 2 * np.pi * np.arange(self.FFT_LEN // 2) / self.FFT_LEN
+        self.twiddle_re = np.round(np.cos(angle) * amplitude).astype(np.int64)
+        self.twiddle_im = np.round(-np.sin(angle) * amplitude).astype(np.int64)
+        self.bitrev = self._bit_reversal(self.NFFT)
+
+    def fft(self, data_re, data_im):
+        """
+        returns do_re, do_im with shape (num_symbols, FFT_LEN) and blk_exp_o per symbol
+
+        data_re and data_im are di_re and di_im with shape (num_symbols, FFT_LEN), blk_exp_o is 0 without DBS.
+        """
+        re = np.atleast_2d(np.asarray(data_re, np.int64))
+        im = np.atleast_2d(np.asarray(data_im, np.int64))
+        assert re.shape[-1] == self.FFT_LEN, f'symbols need {self.FFT_LEN} samples'
+        num_symbols = re.shape[0]
+        for stage in range(self.NFFT):
+            half = self.FFT_LEN >> (stage + 1)
+            re, im = self._butterfly(re.reshape(num_symbols, -1, 2, half), im.reshape(num_symbols, -1, 2, half), stage)
+        re = re.reshape(num_symbols, self.FFT_LEN)[:, self.bitrev]
+        im = im.reshape(num_symbols, self.FFT_LEN)[:, self.bitrev]
+        if self.SHIFTED:
+            re = np.roll(re, self.FFT_LEN // 2, axis = 1)
+            im = np.roll(im, self.FFT_LEN // 2, axis = 1)
+        if not self.DBS:
+            return re, im, np.zeros(num_symbols, np.int64)
+        blk_exp = self.blk_exp(re, im)
+        return re << blk_exp[:, None], im << blk_exp[:, None], blk_exp
+
+    def blk_exp(self, re, im):
+        """number of redundant sign bits of the largest component of every symbol"""
+        used = np.maximum(np.where(re < 0, ~re, re), np.where(im < 0, ~im, im)).max(axis = -1)
+        # bit length of used, floor(log2) is exact for integers below 2 ** 48
+        bit_length = np.where(used > 0, np.floor(np.log2(np.maximum(used, 1))).astype(np.int64) + 1, 0)
+        return np.maximum(self.OUT_WIDTH - 1 - bit_length, 0)
+
+    def _butterfly(self, re, im, stage):
+        a_re, b_re = re[:, :, 0], re[:, :, 1]
+        a_im, b_im = im[:, :, 0], im[:, :, 1]
+        sum_re, sum_im = a_re + b_re, a_im + b_im
+        diff_re, diff_im = a_re - b_re, a_im - b_im
+        if not self.FORMAT:
+            sum_re, sum_im, diff_re, diff_im = sum_re >> 1, sum_im >> 1, diff_re >> 1, diff_im >> 1
+        # twiddle k of this stage is W(k * 2 ** stage)
+        w_re = self.twiddle_re[::2 ** stage]
+        w_im = self.twiddle_im[::2 ** stage]
+        shift = self.TWDL_WIDTH - 1
+        rot_re = (diff_re * w_re - diff_im * w_im) >> shift
+        rot_im = (diff_re * w_im + diff_im * w_re) >> shift
+        rot_re[..., 0] = diff_re[..., 0]
+        rot_im[..., 0] = diff_im[..., 0]
+        return np.stack((sum_re, rot_re), axis = 2), np.stack((sum_im, rot_im), axis = 2)
+
+    @staticmethod
+    def _bit_reversal(NFFT):
+        idx = np.arange(2 ** NFFT)
+        result = np.zeros_like(idx)
+        for bit in range(NFFT):
+            result |= ((idx >> bit) & 1) << (NFFT - 1 - bit)
+        return result
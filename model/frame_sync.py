@@ -0,0 +1,181 @@
+import numpy as np
+
+def _clog2(val):
+    return int(np.ceil(np.log2(val)))
+
+class Model:
+    """
+    model of the symbol timing of frame_sync
+
+    The model covers the default configuration of frame_sync_regmap: reconnect_mode = RECONNECT_MODE_AUTO,
+    timing_advance_mode = TA_MODE_AUTO and s_axis_in_tvalid = 1 for every sample. Sample n of the input is
+    the sample that is presented in clock cycle n after reset, cycle 0 is the RESET_DETECTOR cycle.
+
+    - The first N_id_2_valid_i in WAIT_FOR_SSB starts a symbol with sym_cnt = 2 and CP2_LEN at its own sample,
+      sfn and subframe_number keep their values.
+    - SYMS_BTWN_SSB - 1 symbols later frame_sync goes into find mode FIND_SAMPLES_TOLERANCE samples before the end
+      of the symbol. An N_id_2_valid_i in find mode ends the symbol early or late (re-sync), if none comes within
+      FIND_SAMPLES_TOLERANCE samples after the expected end the connection is lost and frame_sync waits for the
+      next SSB. N_id_2_valid_i outside of WAIT_FOR_SSB and find mode is ignored.
+    - ibar_SSB_i and rgf_overflow_i are only forwarded to the regmap and do not change the timing.
+
+    The outputs are given per input sample, m_axis_out_* of sample n appear 2 clock cycles later in the HDL.
+    """
+    SFN_MAX = 1023
+    SUBFRAMES_PER_FRAME = 20
+    SYM_PER_SF = 14
+    SYMS_BTWN_SSB = SUBFRAMES_PER_FRAME * SYM_PER_SF
+    SSB_SYMBOL = 2  # sym_cnt after an SSB was found in WAIT_FOR_SSB
+
+    SCHEDULE_DTYPE = np.dtype([('start', np.int64), ('length', np.int64), ('CP_len', np.int64), ('SFN', np.int64),
+        ('subframe', np.int64), ('symbol', np.int64), ('tuser', np.int64), ('SSB_start', bool)])
+
+    def __init__(self, NFFT, sym_cnt_offset = 0):
+        self.NFFT = int(NFFT)
+        self.sym_cnt_offset = int(sym_cnt_offset)
+        self.FFT_LEN = 2 ** self.NFFT
+        self.CP1_LEN = 20 * self.FFT_LEN // 256
+        self.CP2_LEN = 18 * self.FFT_LEN // 256
+        self.MAX_CP_LEN = self.CP1_LEN
+        self.CIC_RATE = 2 ** (self.NFFT - 7)
+        self.FIND_SAMPLES_TOLERANCE = 3 * self.CIC_RATE
+        self.SFN_WIDTH = _clog2(self.SFN_MAX)
+        self.SUBFRAME_NUMBER_WIDTH = _clog2(self.SUBFRAMES_PER_FRAME - 1)
+        self.SYMBOL_NUMBER_WIDTH = _clog2(self.SYM_PER_SF - 1)
+        self.CP_LEN_WIDTH = _clog2(self.MAX_CP_LEN)
+        self.USER_WIDTH = self.SFN_WIDTH + self.SUBFRAME_NUMBER_WIDTH + self.SYMBOL_NUMBER_WIDTH + self.CP_LEN_WIDTH
+
+    def schedule(self, num_samples, N_id_2_pos):
+        """
+        all symbols that frame_sync outputs for a capture of num_samples samples, as array of SCHEDULE_DTYPE
+
+        N_id_2_pos are the samples with N_id_2_valid_i = 1. start and length give the samples of every symbol
+        including its CP, tuser is m_axis_out_tuser {SFN, subframe, symbol, CP_len} and SSB_start marks the
+        symbols that were started by SSB_start_o. The last symbol before a disconnect has one more valid sample,
+        because out_valid is not cleared in the RESET_DETECTOR cycle.
+        """
+        N_id_2_pos = np.unique(np.asarray(N_id_2_pos, np.int64))
+        num_samples = int(num_samples)
+        segments = []
+        # absolute symbol number SFN * SUBFRAMES_PER_FRAME * SYM_PER_SF + subframe * SYM_PER_SF + sym_cnt
+        sym_abs = 0
+        earliest = 1
+        SSB_start = False
+        while True:
+            idx = np.searchsorted(N_id_2_pos, earliest)
+            if idx == len(N_id_2_pos) or N_id_2_pos[idx] >= num_samples:
+                break
+            pos = int(N_id_2_pos[idx])
+            frame = sym_abs - sym_abs % self.SYM_PER_SF
+            sym_abs = frame + self.SSB_SYMBOL
+            while True:
+                symbols = sym_abs + np.arange(self.SYMS_BTWN_SSB)
+                CP_len = self.CP_len(symbols)
+                if not SSB_start:
+                    CP_len[0] = self.CP2_LEN
+                lengths = self.FFT_LEN + CP_len
+                starts = pos + np.concatenate(([0], np.cumsum(lengths[:-1])))
+                last = starts[-1]
+                # find mode is active from this sample on, the connection is lost at the end of the window
+                window = (last + lengths[-1] - self.FIND_SAMPLES_TOLERANCE + 2, last + lengths[-1] + self.FIND_SAMPLES_TOLERANCE)
+                idx = np.searchsorted(N_id_2_pos, window[0])
+                found = idx < len(N_id_2_pos) and N_id_2_pos[idx] <= window[1]
+                if found:
+                    lengths[-1] = N_id_2_pos[idx] - last
+                else:
+                    lengths[-1] = window[1] + 3 - last
+                segments.append(self._segment(starts, lengths, symbols, CP_len, SSB_start))
+                SSB_start = found
+                sym_abs = int(symbols[-1]) + 1
+                if not found or starts[-1] + lengths[-1] >= num_samples:
+                    break
+                pos = int(N_id_2_pos[idx])
+            if SSB_start:
+                break
+            # RESET_DETECTOR and then WAIT_FOR_SSB
+            sym_abs -= 1
+            earliest = window[1] + 3
+        if not segments:
+            return np.zeros(0, self.SCHEDULE_DTYPE)
+        result = np.concatenate(segments)
+        result = result[result['start'] < num_samples]
+        result['length'] = np.minimum(result['length'], num_samples - result['start'])
+        return result
+
+    def stream(self, num_samples, N_id_2_pos):
+        """returns m_axis_out_tvalid, m_axis_out_tuser and m_axis_out_tlast for every input sample"""
+        sched = self.schedule(num_samples, N_id_2_pos)
+        valid = np.zeros(num_samples, bool)
+        tuser = np.zeros(num_samples, np.int64)
+        tlast = np.zeros(num_samples, bool)
+        if len(sched) == 0:
+            return valid, tuser, tlast
+        sample = self._ranges(sched['start'], sched['length'])
+        offset = sample - np.repeat(sched['start'], sched['length'])
+        valid[sample] = True
+        tuser[sample] = np.repeat(sched['tuser'], sched['length'])
+        # out_last compares the sample_cnt of the previous sample with the CP_len of the previous sample
+        CP_len = np.repeat(sched['CP_len'], sched['length'])
+        prev_len = np.repeat(np.concatenate(([0], sched['length'][:-1])), sched['length'])
+        prev_CP_len = np.repeat(np.concatenate(([0], sched['CP_len'][:-1])), sched['length'])
+        first = offset == 0
+        cnt = np.where(first, prev_len - 1, offset - 1)
+        tlast[sample] = cnt == self.FFT_LEN + np.where(first, prev_CP_len, CP_len) - 2
+        # a symbol that follows WAIT_FOR_SSB keeps out_last = 0
+        new_sync = np.concatenate(([True], sched['start'][1:] != sched['start'][:-1] + sched['length'][:-1]))
+        tlast[sched['start'][new_sync]] = False
+        return valid, tuser, tlast
+
+    def symbols(self, waveform, sched, CP_ADVANCE = 0):
+        """
+        FFT input of every complete symbol of sched with shape (num_symbols, FFT_LEN) and the used part of sched
+
+        CP_ADVANCE samples of the CP are used as well, like FFT_demod with HALF_CP_ADVANCE.
+        """
+        waveform = np.asarray(waveform)
+        first = sched['start'] + sched['CP_len'] - CP_ADVANCE
+        complete = (first + self.FFT_LEN <= len(waveform)) & (sched['length'] >= sched['CP_len'] + self.FFT_LEN)
+        sched = sched[complete]
+        return waveform[first[complete][:, None] + np.arange(self.FFT_LEN)], sched
+
+    def CP_len(self, sym_abs):
+        """CP length of absolute symbol numbers, it depends on (sym_cnt + sym_cnt_offset) % SYM_PER_SF"""
+        sym = (np.asarray(sym_abs, np.int64) + self.sym_cnt_offset) % self.SYM_PER_SF
+        return np.where((sym == 0) | (sym == 7), self.CP1_LEN, self.CP2_LEN)
+
+    def unpack_tuser(self, tuser):
+        """returns SFN, subframe number, symbol number and CP_len of m_axis_out_tuser"""
+        tuser = np.asarray(tuser, np.int64)
+        CP_len = tuser & (2 ** self.CP_LEN_WIDTH - 1)
+        tuser = tuser >> self.CP_LEN_WIDTH
+        sym = tuser & (2 ** self.SYMBOL_NUMBER_WIDTH - 1)
+        tuser = tuser >> self.SYMBOL_NUMBER_WIDTH
+        subframe = tuser & (2 ** self.SUBFRAME_NUMBER_WIDTH - 1)
+        SFN = tuser >> self.SUBFRAME_NUMBER_WIDTH
+        return SFN, subframe, sym, CP_len
+
+    def _segment(self, starts, lengths, symbols, CP_len, SSB_start):
+        sym = symbols % self.SYM_PER_SF
+        subframe = (symbols // self.SYM_PER_SF) % self.SUBFRAMES_PER_FRAME
+        SFN = (symbols // self.SYMS_BTWN_SSB) % self.SFN_MAX
+        result = np.zeros(len(starts), self.SCHEDULE_DTYPE)
+        result['start'] = starts
+        result['length'] = lengths
+        result['CP_len'] = CP_len
+        result['SFN'] = SFN
+        result['subframe'] = subframe
+        result['symbol'] = sym
+        result['tuser'] = (((((SFN << self.SUBFRAME_NUMBER_WIDTH) + subframe) << self.SYMBOL_NUMBER_WIDTH) + sym) \
+            << self.CP_LEN_WIDTH) + (CP_len & (2 ** self.CP_LEN_WIDTH - 1))
+        result['SSB_start'][0] = SSB_start
+        return result
+
+    @staticmethod
+    def _ranges(starts, lengths):
+        # concatenation of arange(start, start + length) for all pairs without a python loop
+        total = int(lengths.sum())
+        steps = np.ones(total, np.int64)
+        ends = np.cumsum(lengths)
+        steps[0] = starts[0]
+        steps[ends[:-1]] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+        return np.cumsum(steps)
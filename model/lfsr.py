@@ -0,0 +1,137 @@
+import numpy as np
+
+Nc = 1600  # bits that are skipped at the start of the gold sequence from 38.211 5.2.1
+
+def _parity(val):
+    # xor of all bits of every uint64 value
+    val = val ^ (val >> np.uint64(32))
+    val = val ^ (val >> np.uint64(16))
+    val = val ^ (val >> np.uint64(8))
+    val = val ^ (val >> np.uint64(4))
+    val = val ^ (val >> np.uint64(2))
+    val = val ^ (val >> np.uint64(1))
+    return val & np.uint64(1)
+
+class Model:
+    """
+    model of LFSR
+
+    The LFSR submodule is not part of this repository, this model uses the convention that hdl/SSS_detector.sv and
+    hdl/channel_estimator.sv rely on: bit i of START_VALUE is x(i), data_o is x(n) and bit i of TAPS adds x(n + i)
+    to x(n + N), so TAPS = 'h11 with N = 7 is x(n + 7) = x(n + 4) + x(n).
+
+    The state is a packed uint64 per start value. One step of generate() shifts out N - (highest tap) bits at once,
+    generate_packed() computes whole 64 bit words and jump() advances by an arbitrary number of bits with a power
+    of the GF(2) state transition matrix.
+    """
+    def __init__(self, N, TAPS, START_VALUE = 1):
+        self.N = int(N)
+        self.TAPS = int(TAPS)
+        self.START_VALUE = int(START_VALUE)
+        assert 0 < self.N <= 63, 'N has to fit into a uint64 state'
+        assert 0 < self.TAPS < 2 ** self.N, 'TAPS has to be nonzero and below 2 ** N'
+        # bits that can be computed in parallel without depending on each other
+        self.STEP_BITS = self.N - (self.TAPS.bit_length() - 1)
+        self.mask = np.uint64(2 ** self.N - 1)
+        # rows of the transition matrix for one clock cycle, row i gives the new bit i of the state
+        self.rows = np.array([1 << (i + 1) for i in range(self.N - 1)] + [self.TAPS], np.uint64)
+        self._jump_cache = {1: self.rows}
+
+    def jump_matrix(self, steps):
+        """rows of the state transition matrix for steps clock cycles, cached"""
+        steps = int(steps)
+        if steps == 0:
+            return np.array([1 << i for i in range(self.N)], np.uint64)
+        if steps not in self._jump_cache:
+            half = self.jump_matrix(steps // 2)
+            matrix = self._multiply(half, half)
+            if steps % 2:
+                matrix = self._multiply(matrix, self.rows)
+            self._jump_cache[steps] = matrix
+        return self._jump_cache[steps]
+
+    def jump(self, state, steps):
+        """states after steps clock cycles for every state"""
+        state = np.atleast_1d(np.asarray(state, np.uint64)) & self.mask
+        rows = self.jump_matrix(steps)
+        result = np.zeros(state.shape, np.uint64)
+        for i, row in enumerate(rows):
+            result |= _parity(state & row) << np.uint64(i)
+        return result
+
+    def generate_packed(self, length, start_value = None, offset = 0):
+        """
+        data_o from clock cycle offset on with shape (num_start_values, ceil(length / 64)) as uint64 words
+
+        Bit j of word k is the output of clock cycle offset + 64 k + j, the bits after length are 0. start_value
+        defaults to START_VALUE, an array of start values generates all sequences in parallel.
+
+        Squaring the characteristic polynomial over GF(2) six times turns x(n + N) = sum of x(n + i) for the taps i
+        into x(n + 64 N) = sum of x(n + 64 i), so the words follow the same recurrence as the bits:
+        word(k + N) = xor of word(k + i). Only the first N words are generated bit by bit.
+        """
+        num_words = -(-int(length) // 64)
+        num_seed_words = min(num_words, self.N)
+        bits = self.generate(num_seed_words * 64, start_value, offset)
+        words = np.empty((len(bits), num_words), np.uint64)
+        words[:, :num_seed_words] = np.packbits(bits, axis = 1, bitorder = 'little').view('<u8')
+        taps = [i for i in range(self.N) if (self.TAPS >> i) & 1]
+        for k in range(self.N, num_words):
+            word = words[:, k - self.N + taps[0]].copy()
+            for tap in taps[1:]:
+                word ^= words[:, k - self.N + tap]
+            words[:, k] = word
+        if int(length) % 64:
+            words[:, -1] &= np.uint64(2 ** (int(length) % 64) - 1)
+        return words
+
+    def generate(self, length, start_value = None, offset = 0):
+        """data_o from clock cycle offset on with shape (num_start_values, length) as uint8 bits"""
+        start_value = self.START_VALUE if start_value is None else start_value
+        state = self.jump(start_value, offset)
+        W = self.STEP_BITS
+        step_mask = np.uint64(2 ** W - 1)
+        taps = [np.uint64(i) for i in range(self.N) if (self.TAPS >> i) & 1]
+        num_steps = -(-int(length) // W)
+        chunks = np.empty((len(state), num_steps), np.uint64)
+        for k in range(num_steps):
+            chunks[:, k] = state & step_mask
+            new = np.zeros(state.shape, np.uint64)
+            for tap in taps:
+                new ^= state >> tap
+            state = (state >> np.uint64(W)) | ((new & step_mask) << np.uint64(self.N - W))
+        bits = (chunks[:, :, None] >> np.arange(W, dtype = np.uint64)) & np.uint64(1)
+        return bits.reshape(len(state), num_steps * W)[:, :int(length)].astype(np.uint8)
+
+    def _multiply(self, a, b):
+        # rows of the matrix product a * b over GF(2)
+        result = np.zeros(self.N, np.uint64)
+        for i, row in enumerate(a):
+            for j in range(self.N):
+                if (int(row) >> j) & 1:
+                    result[i] ^= b[j]
+        return result
+
+# x1 and x2 of the gold sequence, like lfsr_0_i and LFSR_1 in hdl/channel_estimator.sv
+_x1 = Model(31, 0b1001, 1)
+_x2 = Model(31, 0b1111, 1)
+
+def gold_sequence(c_init, length, offset = 0):
+    """pseudo-random sequence c(offset + n) from 38.211 5.2.1 with shape (len(c_init), length), one row per c_init"""
+    c_init = np.atleast_1d(np.asarray(c_init, np.int64)).astype(np.uint64)
+    return _x1.generate(length, offset = Nc + offset) ^ _x2.generate(length, c_init, offset = Nc + offset)
+
+def gold_sequence_packed(c_init, length, offset = 0):
+    """gold_sequence() packed into uint64 words like Model.generate_packed()"""
+    c_init = np.atleast_1d(np.asarray(c_init, np.int64)).astype(np.uint64)
+    return _x1.generate_packed(length, offset = Nc + offset) ^ _x2.generate_packed(length, c_init, offset = Nc + offset)
+
+def pbch_prbs(N_id, v, E):
+    """PBCH scrambling sequences c(v E + n) with c_init = N_id from 38.211 7.3.3.1, one row per pair of N_id and v"""
+    N_id, v = np.broadcast_arrays(np.atleast_1d(np.asarray(N_id, np.int64)), np.atleast_1d(np.asarray(v, np.int64)))
+    result = np.empty((len(N_id), int(E)), np.uint8)
+    # rows with the same v share the offset and therefore the jump matrix
+    for offset in np.unique(v):
+        rows = v == offset
+        result[rows] = gold_sequence(N_id[rows], E, int(offset) * int(E))
+    return result
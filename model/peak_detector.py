@@ -1,13 +1,127 @@
 import numpy as np
 
 
+def _twos_comp(val, bits):
+    """compute the 2's complement of int value val"""
+    if (val & (1 << (bits - 1))) != 0:
+        val = val - (1 << bits)
+    return int(val)
+
 class Model:
-    def __init__(self, IN_DW, WINDOW_LEN):
+    """
+    model of Peak_detector
+
+    noise_limit, detection_shift and enable correspond to the noise_limit_i, detection_shift_i and enable_i inputs,
+    they can be changed between ticks. The average register sums up the WINDOW_LEN - 1 samples before the
+    previous sample, because it adds in_buffer[0] and subtracts in_buffer[WINDOW_LEN - 1] in the same clock cycle.
+    """
+    def __init__(self, IN_DW, WINDOW_LEN, NOISE_LIMIT = 0, DETECTION_SHIFT = 3, ENABLE = 1):
         self.IN_DW = int(IN_DW)
         self.WINDOW_LEN = int(WINDOW_LEN)
+        self.AVERAGE_DW = self.IN_DW + int(np.ceil(np.log2(self.WINDOW_LEN)))
+        self.noise_limit = int(NOISE_LIMIT)
+        self.detection_shift = int(DETECTION_SHIFT)
+        self.enable = int(ENABLE)
+        self.reset()
+
+    def _total_shift(self, detection_shift):
+        # total_shift is a signed 8 bit wire
+        return _twos_comp((int(np.ceil(np.log2(self.WINDOW_LEN))) - detection_shift) & 0xFF, 8)
+
+    def _threshold(self, average, total_shift):
+        if total_shift > 0:
+            return average >> total_shift
+        # -total_shift is also 8 bit, the comparison is done with AVERAGE_DW bits
+        return (average << ((-total_shift) & 0xFF)) & (2 ** self.AVERAGE_DW - 1)
 
     def tick(self):
-        pass
+        if self.in_buffer is None:
+            self.peak_valid_o = 0
+            self.peak_detected_o = 0
+            return
+
+        data = self.in_buffer
+        self.in_buffer = None
+        self.peak_valid_o = int(self.init_counter == self.WINDOW_LEN)
+        if self.init_counter == self.WINDOW_LEN:
+            threshold = self._threshold(self.average, self._total_shift(self.detection_shift))
+            if data > threshold and data > self.noise_limit:
+                self.peak_detected_o = int(self.enable != 0)
+                self.score_o = (data - threshold) & (2 ** self.IN_DW - 1)
+            else:
+                self.peak_detected_o = 0
+                self.score_o = 0
+        else:
+            self.peak_detected_o = 0
+            self.score_o = 0
+        if self.init_counter < self.WINDOW_LEN:
+            self.init_counter += 1
+
+        self.average = (self.average + self.window[0] - self.window[-1]) & (2 ** self.AVERAGE_DW - 1)
+        self.window[1:] = self.window[:-1]
+        self.window[0] = data
+
+    def set_data(self, data_in):
+        self.in_buffer = int(data_in) & (2 ** self.IN_DW - 1)
 
     def reset(self):
-        pass
\ No newline at end of file
+        self.window = [0] * self.WINDOW_LEN
+        self.in_buffer = None
+        self.average = 0
+        self.init_counter = 0
+        self.peak_detected_o = 0
+        self.peak_valid_o = 0
+        self.score_o = 0
+
+    def peak_detected(self):
+        return self.peak_detected_o
+
+    def peak_valid(self):
+        return self.peak_valid_o
+
+    def get_score(self):
+        return self.score_o
+
+    def detect(self, data_in, noise_limit = None, detection_shift = None, enable = None):
+        """
+        vectorized version of set_data() and tick() for every sample of data_in, starting from the reset state
+
+        data_in are consecutive valid input samples, e.g. the result[valid] output of PSS_correlator.Model.correlate().
+        noise_limit, detection_shift and enable default to the values of this model.
+        Returns peak_detected, score and peak_valid for every sample.
+        """
+        noise_limit = self.noise_limit if noise_limit is None else int(noise_limit)
+        detection_shift = self.detection_shift if detection_shift is None else int(detection_shift)
+        enable = self.enable if enable is None else int(enable)
+
+        if self.AVERAGE_DW <= 64:
+            dtype, const = np.uint64, np.uint64
+        else:
+            dtype, const = object, int
+        data = np.asarray(data_in, dtype = object if dtype is object else None).astype(dtype) & const(2 ** self.IN_DW - 1)
+        num_samples = len(data)
+
+        # the average used for sample k is the sum of the samples k - WINDOW_LEN ... k - 2,
+        # the uint64 cumsum wraps around, which doesn't matter because the result is masked to AVERAGE_DW bits
+        cumsum = np.zeros(num_samples + 1, dtype)
+        cumsum[1:] = np.cumsum(data, dtype = dtype)
+        idx = np.arange(num_samples)
+        upper = cumsum[np.maximum(idx - 1, 0)]
+        lower = cumsum[np.maximum(idx - self.WINDOW_LEN, 0)]
+        average = (upper - lower) & const(2 ** self.AVERAGE_DW - 1)
+
+        total_shift = self._total_shift(detection_shift)
+        shift = total_shift if total_shift > 0 else (-total_shift) & 0xFF
+        if shift >= self.AVERAGE_DW:
+            threshold = np.zeros(num_samples, dtype)
+        elif total_shift > 0:
+            threshold = average >> const(shift)
+        else:
+            threshold = (average << const(shift)) & const(2 ** self.AVERAGE_DW - 1)
+
+        peak_valid = idx >= self.WINDOW_LEN
+        detected = peak_valid & (data > threshold) & (data > const(noise_limit))
+        score = np.zeros(num_samples, dtype)
+        score[detected] = (data[detected] - threshold[detected]) & const(2 ** self.IN_DW - 1)
+        peak_detected = detected & (enable != 0)
+        return peak_detected, score, peak_valid
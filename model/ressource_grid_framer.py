@@ -0,0 +1,76 @@
+import numpy as np
+import os
+
+class Model:
+    """
+    model of the ressource_grid_framer output format
+
+    Every symbol is sent as one packet of IQ_WIDTH bit words, tlast is set on the last word:
+
+    - blk_exp of the symbol (BLK_EXP_LEN LSBs, the rest is 0)
+    - NUM_TIMESTAMP_SAMPLES words of the 64 bit sample_id, LSB first
+    - SYMBOL_LEN IQ words {im, re}
+
+    The AXI-DMAC writes the words little endian, so a buffer of packets maps onto DTYPE without copying.
+    The timestamp field is an unaligned little endian uint64 and iq has the shape (SYMBOL_LEN, 2) with re and im
+    as signed integers of IQ_WIDTH / 2 bits. The views are read-only for read-only buffers like bytes.
+    """
+    SAMPLE_ID_WIDTH = 64
+
+    def __init__(self, SYMBOL_LEN, IQ_WIDTH = 16, BLK_EXP_LEN = 8):
+        self.SYMBOL_LEN = int(SYMBOL_LEN)
+        self.IQ_WIDTH = int(IQ_WIDTH)
+        self.BLK_EXP_LEN = int(BLK_EXP_LEN)
+        # re and im have to be whole bytes for the views
+        assert self.IQ_WIDTH in [16, 32], 'only IQ_WIDTH = 16 and IQ_WIDTH = 32 are supported'
+        self.NUM_TIMESTAMP_SAMPLES = self.SAMPLE_ID_WIDTH // self.IQ_WIDTH
+        self.PACKET_LEN = 1 + self.NUM_TIMESTAMP_SAMPLES + self.SYMBOL_LEN
+        word_bytes = self.IQ_WIDTH // 8
+        self.WORD_DTYPE = np.dtype(f'<u{word_bytes}')
+        self.DTYPE = np.dtype({
+            'names': ['blk_exp', 'timestamp', 'iq'],
+            'formats': [self.WORD_DTYPE, '<u8', (np.dtype(f'<i{word_bytes // 2}'), (self.SYMBOL_LEN, 2))],
+            'offsets': [0, word_bytes, word_bytes * (1 + self.NUM_TIMESTAMP_SAMPLES)],
+            'itemsize': word_bytes * self.PACKET_LEN
+        })
+
+    def parse(self, buffer):
+        """
+        all complete packets of buffer as array of DTYPE, without copying
+
+        buffer can be bytes, bytearray, mmap, memoryview or a contiguous array of words. Bytes after the last
+        complete packet are ignored, so a DMA buffer can be parsed while it is filled.
+        """
+        num_bytes = memoryview(buffer).nbytes
+        return np.frombuffer(buffer, self.DTYPE, count = num_bytes // self.DTYPE.itemsize)
+
+    def parse_words(self, words):
+        """parse() for a sequence of m_axis_fifo_tdata words like the ones collected by a testbench"""
+        return self.parse(np.ascontiguousarray(words, self.WORD_DTYPE))
+
+    def open(self, file_name):
+        """all complete packets of a file that the DMA output was written to, as read-only memory map"""
+        num_packets = os.path.getsize(file_name) // self.DTYPE.itemsize
+        if num_packets == 0:
+            # np.memmap cannot map an empty file
+            return np.zeros(0, self.DTYPE)
+        return np.memmap(file_name, self.DTYPE, mode = 'r', shape = (num_packets,))
+
+    def blk_exp(self, packets):
+        """blk_exp of every packet"""
+        return packets['blk_exp'] & (2 ** self.BLK_EXP_LEN - 1)
+
+    def iq(self, packets):
+        """IQ samples of every packet as complex integers with shape (num_packets, SYMBOL_LEN), this is a copy"""
+        iq = packets['iq']
+        return iq[..., 0] + 1j * iq[..., 1]
+
+    def pack(self, blk_exp, timestamp, iq):
+        """words of packets for the given blk_exp, timestamp and complex IQ samples, like the HDL outputs them"""
+        iq = np.atleast_2d(iq)
+        packets = np.zeros(len(iq), self.DTYPE)
+        packets['blk_exp'] = np.asarray(blk_exp) & (2 ** self.BLK_EXP_LEN - 1)
+        packets['timestamp'] = timestamp
+        packets['iq'][..., 0] = np.real(iq)
+        packets['iq'][..., 1] = np.imag(iq)
+        return packets.view(self.WORD_DTYPE)
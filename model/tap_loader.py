@@ -0,0 +1,74 @@
+import numpy as np
+import os
+
+# decoded tap sets, keyed on (source, TAP_DW, PSS_LEN)
+_cache = {}
+
+def _twos_comp_array(val, bits):
+    """compute the 2's complement of every element in an int64 array"""
+    val = np.asarray(val, np.int64) & ((1 << bits) - 1)
+    return np.where(val & (1 << (bits - 1)), val - (1 << bits), val)
+
+def _tap_dtype(bits):
+    if bits <= 16:
+        return np.int16
+    if bits <= 32:
+        return np.int32
+    return np.int64
+
+def unpack_taps(words, TAP_DW):
+    """split packed {im, re} tap words into sign extended re and im arrays"""
+    words = np.asarray(words).astype(np.uint64)
+    mask = np.uint64(2 ** (TAP_DW // 2) - 1)
+    tap_re = _twos_comp_array((words & mask).astype(np.int64), TAP_DW // 2)
+    tap_im = _twos_comp_array(((words >> np.uint64(TAP_DW // 2)) & mask).astype(np.int64), TAP_DW // 2)
+    dtype = _tap_dtype(TAP_DW // 2)
+    return tap_re.astype(dtype), tap_im.astype(dtype)
+
+def unpack_PSS_LOCAL(PSS_LOCAL, TAP_DW, PSS_LEN):
+    """split the PSS_LOCAL parameter, which holds PSS_LEN taps of TAP_DW bits each, into re and im arrays"""
+    num_bits = TAP_DW * PSS_LEN
+    PSS_LOCAL = int(PSS_LOCAL) & ((1 << num_bits) - 1)
+    raw = np.frombuffer(PSS_LOCAL.to_bytes((num_bits + 7) // 8, 'little'), np.uint8)
+    bits = np.unpackbits(raw, bitorder = 'little')[:num_bits].reshape(PSS_LEN, TAP_DW).astype(np.int64)
+    weights = np.int64(1) << np.arange(TAP_DW // 2, dtype = np.int64)
+    tap_re = _twos_comp_array(bits[:, :TAP_DW // 2] @ weights, TAP_DW // 2)
+    tap_im = _twos_comp_array(bits[:, TAP_DW // 2:2 * (TAP_DW // 2)] @ weights, TAP_DW // 2)
+    dtype = _tap_dtype(TAP_DW // 2)
+    return tap_re.astype(dtype), tap_im.astype(dtype)
+
+def read_tap_file(TAP_FILE):
+    """read the hex words of a tap file in $readmemh format"""
+    words = []
+    with open(TAP_FILE) as f:
+        for line in f:
+            line = line.split('//')[0].strip()
+            if line and not line.startswith('@'):
+                words.extend(int(word, 16) for word in line.split())
+    return words
+
+def load_taps(TAP_DW, PSS_LEN, PSS_LOCAL = 0, USE_TAP_FILE = 0, TAP_FILE = ''):
+    """
+    returns read-only tap_re and tap_im arrays for a PSS_LOCAL parameter or a tap file
+
+    The results are cached, tap files are identified by their path, size and modification time,
+    so regenerated tap files are read again.
+    """
+    TAP_DW = int(TAP_DW)
+    PSS_LEN = int(PSS_LEN)
+    if USE_TAP_FILE:
+        path = os.path.abspath(TAP_FILE)
+        stat = os.stat(path)
+        source = ('file', path, stat.st_size, stat.st_mtime_ns)
+    else:
+        source = ('PSS_LOCAL', int(PSS_LOCAL))
+    key = (source, TAP_DW, PSS_LEN)
+    if key not in _cache:
+        if USE_TAP_FILE:
+            tap_re, tap_im = unpack_taps(read_tap_file(TAP_FILE)[:PSS_LEN], TAP_DW)
+        else:
+            tap_re, tap_im = unpack_PSS_LOCAL(PSS_LOCAL, TAP_DW, PSS_LEN)
+        tap_re.setflags(write = False)
+        tap_im.setflags(write = False)
+        _cache[key] = (tap_re, tap_im)
+    return _cache[key]
@@ -2,6 +2,7 @@ import numpy as np
 import os
 import pytest
 import logging
+import importlib.util
 import matplotlib.pyplot as plt
 import os
 
@@ -22,16 +23,33 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+# model/complex_multiplier.py is not checked against the sources of the complex_multiplier submodule yet,
+# a mismatch with the model only fails the test with EXACT_SUBMODULE_MODELS=1, the tolerance check always applies
+EXACT_SUBMODULE_MODELS = os.environ.get('EXACT_SUBMODULE_MODELS') == '1'
+
+def _check_model(match, message):
+    if EXACT_SUBMODULE_MODELS:
+        assert match, message
+    elif not match:
+        logging.getLogger('cocotb.tb').warning(message)
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
         self.C_DW = int(dut.C_DW.value)
         self.CFO_DW = int(dut.CFO_DW.value)
         self.DDS_DW = int(dut.DDS_DW.value)
+        self.ATAN_IN_DW = int(dut.ATAN_IN_DW.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/CFO_calc.py'))
+        spec = importlib.util.spec_from_file_location('CFO_calc', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.C_DW, self.CFO_DW, self.DDS_DW, self.ATAN_IN_DW)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
     async def cycle_reset(self):
@@ -52,8 +70,10 @@ async def simple_test(dut):
     C0 = 1
     C1 = C0 * np.exp(1j * angle / 180 * np.pi)
     MAX_VAL = int(2 ** (tb.C_DW // 2 - 1) - 1)
-    dut.C0_i.value = ((int(C0.imag*MAX_VAL) & int(2**(tb.C_DW//2)-1)) << (tb.C_DW//2)) + (int(C0.real*MAX_VAL) & int(2**(tb.C_DW//2)-1))
-    dut.C1_i.value = ((int(C1.imag*MAX_VAL) & int(2**(tb.C_DW//2)-1)) << (tb.C_DW//2)) + (int(C1.real*MAX_VAL) & int(2**(tb.C_DW//2)-1))
+    C0_i = ((int(C0.imag*MAX_VAL) & int(2**(tb.C_DW//2)-1)) << (tb.C_DW//2)) + (int(C0.real*MAX_VAL) & int(2**(tb.C_DW//2)-1))
+    C1_i = ((int(C1.imag*MAX_VAL) & int(2**(tb.C_DW//2)-1)) << (tb.C_DW//2)) + (int(C1.real*MAX_VAL) & int(2**(tb.C_DW//2)-1))
+    dut.C0_i.value = C0_i
+    dut.C1_i.value = C1_i
     dut.valid_i.value = 1
 
     await RisingEdge(dut.clk_i)
@@ -75,6 +95,10 @@ async def simple_test(dut):
 
     assert np.abs(received_angle + angle) < 1
 
+    model_angle, model_DDS_inc = tb.model.calc([C0_i], [C1_i])
+    _check_model(_twos_comp(dut.CFO_angle_o.value.integer, tb.CFO_DW) == model_angle[0], 'CFO_angle_o does not match the CFO_calc model!')
+    _check_model(DDS_inc == model_DDS_inc[0], 'CFO_DDS_inc_o does not match the CFO_calc model!')
+
 @pytest.mark.parametrize("C_DW", [30, 32])
 @pytest.mark.parametrize("CFO_DW", [20, 32])
 @pytest.mark.parametrize("DDS_DW", [20])
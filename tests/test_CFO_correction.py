@@ -27,6 +27,16 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+# model/dds.py is not checked against the sources of the DDS submodule yet, a mismatch with the model
+# only fails the test with EXACT_SUBMODULE_MODELS=1, the tolerance checks always apply
+EXACT_SUBMODULE_MODELS = os.environ.get('EXACT_SUBMODULE_MODELS') == '1'
+
+def _check_model(match, message):
+    if EXACT_SUBMODULE_MODELS:
+        assert match, message
+    elif not match:
+        logging.getLogger('cocotb.tb').warning(message)
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
@@ -39,6 +49,7 @@ class TB(object):
         self.MULT_REUSE = int(dut.MULT_REUSE.value)
         self.CIC_OUT_DW = int(dut.CIC_OUT_DW.value)
         self.DDS_PHASE_DW = int(dut.DDS_PHASE_DW.value)
+        self.DDS_OUT_DW = int(dut.DDS_OUT_DW.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
@@ -50,6 +61,14 @@ class TB(object):
         spec.loader.exec_module(foo)
         self.model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, self.PSS_LOCAL, self.ALGO)
 
+        # tests/sine_lut_16_16.hex has the same values as the LUT that dds_i computes with USE_LUT_FILE = 0
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/dds.py'))
+        spec = importlib.util.spec_from_file_location('dds', model_dir)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.dds_model = foo.Model(self.DDS_PHASE_DW, self.DDS_OUT_DW // 2, USE_TAYLOR = 1, LUT_DW = 16,
+            LUT_FILE = os.path.join(tests_dir, 'sine_lut_16_16.hex'))
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
         cocotb.start_soon(self.model_clk(CLK_PERIOD_NS, 'ns'))
 
@@ -110,6 +129,11 @@ async def simple_test(dut):
     C0 = []
     C1 = []
     C_DW = int(tb.CIC_OUT_DW + tb.TAP_DW + 2 + 2*np.ceil(np.log2(tb.PSS_LEN)))
+    DDS_phase = []
+    DDS_phase_clk = []
+    DDS_out = []
+    DDS_out_clk = []
+    clk_cnt = 0
     while rx_counter < num_items:
         await RisingEdge(dut.clk_i)
         if clk_div < (decimation_factor - 1):
@@ -124,6 +148,14 @@ async def simple_test(dut):
             tb.model.set_data(data)
             in_counter += 1
 
+        if dut.DDS_phase_valid.value.integer == 1:
+            DDS_phase.append(dut.DDS_phase.value.integer)
+            DDS_phase_clk.append(clk_cnt)
+        if dut.DDS_out_valid.value.integer == 1:
+            DDS_out.append(dut.DDS_out.value.integer)
+            DDS_out_clk.append(clk_cnt)
+        clk_cnt += 1
+
         if dut.m_axis_correlator_debug_tvalid.value.integer == 1:
             received[rx_counter] = dut.m_axis_correlator_debug_tdata.value.integer
             C0.append(_twos_comp(dut.C0.value.integer & (2 ** (C_DW // 2) - 1),C_DW // 2) \
@@ -132,6 +164,23 @@ async def simple_test(dut):
                     + 1j * _twos_comp((dut.C1.value.integer >> (C_DW // 2)) & (2 ** (C_DW // 2) - 1), C_DW // 2))
             rx_counter  += 1
 
+    # DDS_phase is incremented by CFO_norm_in for every input sample and stays valid in between,
+    # dds_i has to output one sample for every valid phase after a fixed latency
+    assert len(DDS_out) > 0
+    DDS_LATENCY = DDS_out_clk[0] - DDS_phase_clk[0]
+    print(f'comparing {len(DDS_out)} DDS outputs with the model, latency = {DDS_LATENCY} clock cycles')
+    assert np.array_equal(DDS_out_clk, np.array(DDS_phase_clk[:len(DDS_out_clk)]) + DDS_LATENCY), print('DDS output is not valid for every phase!')
+    DDS_phase = np.array(DDS_phase[:len(DDS_out)], np.int64)
+    assert np.all(np.isin(np.diff(DDS_phase) & (2 ** tb.DDS_PHASE_DW - 1), [0, eff_CFO_corr_norm & (2 ** tb.DDS_PHASE_DW - 1)]))
+    DDS_out = np.array(DDS_out, np.int64)
+    DDS_cos = np.array([_twos_comp(val & (2 ** (tb.DDS_OUT_DW // 2) - 1), tb.DDS_OUT_DW // 2) for val in DDS_out])
+    DDS_sin = np.array([_twos_comp(val >> (tb.DDS_OUT_DW // 2), tb.DDS_OUT_DW // 2) for val in DDS_out])
+
+    model_cos, model_sin = tb.dds_model.dds(DDS_phase)
+    _check_model(np.array_equal(DDS_cos, model_cos) and np.array_equal(DDS_sin, model_sin), 'DDS output does not match the model!')
+    ideal = (2 ** (tb.DDS_OUT_DW // 2 - 1) - 1) * np.exp(1j * 2 * np.pi * DDS_phase / 2 ** tb.DDS_PHASE_DW)
+    assert max(np.abs(DDS_cos + 1j * DDS_sin - ideal)) < 4, print('DDS output is not exp(1j * phase)!')
+
     PSS_LEN = 128
     ssb_start = np.argmax(received) - PSS_LEN
     received = np.array(received)[PSS_LEN:]
@@ -3,7 +3,7 @@ import scipy
 import os
 import pytest
 import logging
-import importlib
+import importlib.util
 import matplotlib.pyplot as plt
 import os
 
@@ -41,7 +41,11 @@ class TB(object):
         self.log.setLevel(logging.DEBUG)
 
         tests_dir = os.path.abspath(os.path.dirname(__file__))
-        model_file = os.path.abspath(os.path.join(tests_dir, '../model/PSS_correlator.py'))
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/cic.py'))
+        spec = importlib.util.spec_from_file_location('cic', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.cic_model = foo.Model(self.IN_DW // 2, self.IN_DW // 2, 2, 3)  # parameters of cic_real and cic_imag
 
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
@@ -90,8 +94,8 @@ async def simple_test(dut):
             received_correlator.append(dut.m_axis_correlator_debug_tdata.value.integer)
 
         if dut.m_axis_cic_debug_tvalid.value.binstr == '1':
-            received_data.append(1j*_twos_comp(dut.m_axis_cic_debug_tdata.value.integer & (2**(tb.OUT_DW//2) - 1), tb.OUT_DW//2)
-                + _twos_comp((dut.m_axis_cic_debug_tdata.value.integer>>(tb.OUT_DW//2)) & (2**(tb.OUT_DW//2) - 1), tb.OUT_DW//2))
+            received_data.append(_twos_comp(dut.m_axis_cic_debug_tdata.value.integer & (2**(tb.IN_DW//2) - 1), tb.IN_DW//2)
+                + 1j*_twos_comp((dut.m_axis_cic_debug_tdata.value.integer>>(tb.IN_DW//2)) & (2**(tb.IN_DW//2) - 1), tb.IN_DW//2))
 
         received[rx_counter] = dut.peak_detected_o.value.integer
         rx_counter += 1
@@ -107,6 +111,10 @@ async def simple_test(dut):
     print(f'highest peak at {peak_pos}')
     assert peak_pos == 840
 
+    decimated_model = tb.cic_model.decimate(waveform[:in_counter])
+    assert len(received_data) > 0
+    assert np.array_equal(np.array(received_data), decimated_model[:len(received_data)])
+
 @pytest.mark.parametrize("ALGO", [0, 1])
 @pytest.mark.parametrize("IN_DW", [32])
 @pytest.mark.parametrize("OUT_DW", [32])
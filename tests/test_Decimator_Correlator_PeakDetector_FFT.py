@@ -26,6 +26,21 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+def _twos_comp_array(val, bits):
+    """_twos_comp for the lower bits of every element of an int64 array"""
+    val = np.asarray(val, np.int64) & (2 ** bits - 1)
+    return np.where(val >= 2 ** (bits - 1), val - 2 ** bits, val)
+
+# model/fft.py and model/complex_multiplier.py are not checked against the sources of the FFT and complex_multiplier
+# submodules yet, a mismatch with the model only fails the test with EXACT_SUBMODULE_MODELS=1, the tolerance checks always apply
+EXACT_SUBMODULE_MODELS = os.environ.get('EXACT_SUBMODULE_MODELS') == '1'
+
+def _check_model(match, message):
+    if EXACT_SUBMODULE_MODELS:
+        assert match, message
+    elif not match:
+        logging.getLogger('cocotb.tb').warning(message)
+
 def phase_comp(sym, f_c, NFFT, sym_idx):
     assert NFFT >= 8
     f_s = 3840000 * (NFFT - 7)
@@ -51,6 +66,27 @@ class TB(object):
         self.HALF_CP_ADVANCE = int(dut.HALF_CP_ADVANCE.value)
         self.NFFT = int(dut.NFFT.value)
         self.MULT_REUSE = int(dut.MULT_REUSE.value)
+        self.USE_TAP_FILE = int(dut.USE_TAP_FILE.value)
+        FFT_OUT_DW = 32
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/fft.py'))
+        spec = importlib.util.spec_from_file_location('fft', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.fft_model = foo.Model(self.NFFT, 1, self.IN_DW // 2, self.IN_DW // 2, SHIFTED = 1, DBS = 1)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/frame_sync.py'))
+        spec = importlib.util.spec_from_file_location('frame_sync', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.frame_sync_model = foo.Model(self.NFFT)
+
+        # the tap file is read from the sim_build folder, like $readmemh in FFT_demod
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/FFT_demod.py'))
+        spec = importlib.util.spec_from_file_location('FFT_demod', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.FFT_demod_model = foo.Model(self.IN_DW, self.HALF_CP_ADVANCE, FFT_OUT_DW, self.NFFT, USE_TAP_FILE = self.USE_TAP_FILE)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
@@ -66,13 +102,6 @@ class TB(object):
         self.dut.reset_ni.value = 1
         await RisingEdge(self.dut.clk_i)
 
-    def fft_dbs(self, fft_signal, width):
-        max_im = np.abs(fft_signal.imag).max()
-        max_re = np.abs(fft_signal.real).max()
-        max_abs_val = max(max_im, max_re)
-        shift_factor = width - np.ceil(np.log2(max_abs_val)) - 1
-        return fft_signal * (2 ** shift_factor)
-
 @cocotb.test()
 async def simple_test(dut):
     tb = TB(dut)
@@ -130,9 +159,10 @@ async def simple_test(dut):
     rx_counter = 0
     clk_cnt = 0
     received = []
-    rx_ADC_data = []
     received_PBCH = []
     received_SSS = []
+    received_SSS_blk_exp = []
+    PSS_out = []
 
     NFFT = tb.NFFT
     FFT_LEN = 2 ** NFFT
@@ -185,6 +215,8 @@ async def simple_test(dut):
         if dut.peak_detected_debug_o.value.integer == 1:
             peaks.append(sample_cnt)
             print(f'peak pos = {sample_cnt}')
+        if dut.m_axis_PSS_out_tvalid.value.integer:
+            PSS_out.append(dut.m_axis_PSS_out_tdata.value.integer)
         sample_cnt += dut.m_axis_PSS_out_tvalid.value.integer
 
         if dut.PBCH_valid_o.value.integer == 1:
@@ -198,6 +230,7 @@ async def simple_test(dut):
             sym = _twos_comp(dut.m_axis_out_tdata.value.integer & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2) \
                 + 1j * _twos_comp((dut.m_axis_out_tdata.value.integer>>(FFT_OUT_DW//2)) & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)
             received_SSS.append(sym)
+            received_SSS_blk_exp.append((dut.m_axis_out_tuser.value.integer >> 1) & (2 ** 8 - 1))
 
         if dut.m_axis_out_tvalid.value.integer == 1:
             blk_exp_len = 8
@@ -211,13 +244,26 @@ async def simple_test(dut):
     assert len(received_SSS) == SSS_LEN
 
     print(f'first peak at = {peaks[0]}')
-    rx_ADC_data = waveform[peaks[0] + CP_LEN + FFT_LEN - 1:]
-    CP_ADVANCE = CP_LEN // 2 if HALF_CP_ADVANCE else CP_LEN
-    ideal_SSS_sym = np.fft.fftshift(np.fft.fft(rx_ADC_data[CP_LEN + FFT_LEN + CP_ADVANCE:][:FFT_LEN]))
-    scaling_factor = 2 ** (tb.IN_DW / 2 + NFFT - FFT_OUT_DW / 2) # FFT core is in truncation mode
-    ideal_SSS_sym = ideal_SSS_sym.real / scaling_factor + 1j * ideal_SSS_sym.imag / scaling_factor
-    ideal_SSS_sym = tb.fft_dbs(ideal_SSS_sym, FFT_OUT_DW / 2)
-    ideal_SSS_sym *= np.exp(1j * (2 * np.pi * (CP_LEN - CP_ADVANCE) / FFT_LEN * np.arange(FFT_LEN) + np.pi * (CP_LEN - CP_ADVANCE)))
+    # the frame_sync model selects the FFT input from the PSS_detector output
+    sched = tb.frame_sync_model.schedule(len(PSS_out), peaks)
+    CP_ADVANCE = CP_LEN // 2 if HALF_CP_ADVANCE else 0
+    fft_in, sched = tb.frame_sync_model.symbols(np.array(PSS_out, np.int64), sched, CP_ADVANCE)
+    SSS_sym = np.flatnonzero((sched['subframe'] == 0) & (sched['symbol'] == 4))[0]
+    assert sched['symbol'][SSS_sym - 1] == 3
+    fft_in = fft_in[SSS_sym - 1:][:2]  # PBCH and SSS symbol
+    fft_re, fft_im, blk_exp = tb.fft_model.fft(_twos_comp_array(fft_in, tb.IN_DW // 2), _twos_comp_array(fft_in >> (tb.IN_DW // 2), tb.IN_DW // 2))
+    ideal_re, ideal_im = tb.FFT_demod_model.output(fft_re, fft_im)
+    model_PBCH_sym, model_SSS_sym = ideal_re + 1j * ideal_im
+    model_SSS = model_SSS_sym[SSS_START:][:SSS_LEN]
+
+    _check_model(np.array_equal(np.array(received_SSS), model_SSS), 'SSS does not match the fft model!')
+    _check_model(np.all(np.array(received_SSS_blk_exp) == blk_exp[1]), 'blk_exp of SSS does not match the fft model!')
+
+    # floating point FFT of the same input, scaled by the blk_exp of the HDL
+    SSS_in = _twos_comp_array(fft_in[1], tb.IN_DW // 2) + 1j * _twos_comp_array(fft_in[1] >> (tb.IN_DW // 2), tb.IN_DW // 2)
+    ideal_SSS_sym = np.fft.fftshift(np.fft.fft(SSS_in))
+    ideal_SSS_sym *= 2.0 ** (received_SSS_blk_exp[0] - (tb.FFT_demod_model.FFT_OUT_DW - FFT_OUT_DW // 2))
+    ideal_SSS_sym *= np.exp(1j * (2 * np.pi * CP_ADVANCE / FFT_LEN * np.arange(FFT_LEN) + np.pi * CP_ADVANCE))
     ideal_SSS = ideal_SSS_sym[SSS_START:][:SSS_LEN]
 
     # phase compensation for SSS symbol
@@ -249,11 +295,8 @@ async def simple_test(dut):
         ax.plot(np.real(received_SSS), np.imag(received_SSS), '.')
         plt.show()
 
-    #received_PBCH= received_PBCH[9:][:FFT_SIZE-8*2 - 1]
-    received_PBCH_ideal = np.fft.fftshift(np.fft.fft(rx_ADC_data[CP_ADVANCE:][:FFT_LEN]))
-    received_PBCH_ideal *= np.exp(1j * ( 2 * np.pi * (CP_LEN - CP_ADVANCE) / FFT_LEN * np.arange(FFT_LEN) + np.pi * (CP_LEN - CP_ADVANCE)))
-    received_PBCH_ideal = received_PBCH_ideal[PBCH_START:][:PBCH_SYMBOL_LEN]
-    received_PBCH_ideal = (received_PBCH_ideal.real.astype(int) + 1j * received_PBCH_ideal.imag.astype(int))
+    received_PBCH_ideal = model_PBCH_sym[PBCH_START:][:PBCH_SYMBOL_LEN]
+    _check_model(np.array_equal(np.array(received_PBCH[:PBCH_SYMBOL_LEN]), received_PBCH_ideal), 'PBCH does not match the fft model!')
     if 'PLOTS' in os.environ and os.environ['PLOTS'] == '1':
         _, axs = plt.subplots(2, 2, figsize=(10, 10))
         axs[0, 0].plot(np.real(received_SSS), np.imag(received_SSS), '.')
@@ -50,6 +50,13 @@ class TB(object):
             self.PSS_LOCAL =  int(dut.PSS_LOCAL.value)        
         self.model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, self.PSS_LOCAL, self.ALGO, self.USE_TAP_FILE, self.TAP_FILE)
 
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/PSS_correlator_fft.py'))
+        spec = importlib.util.spec_from_file_location('PSS_correlator_fft', model_dir)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.fft_model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, [self.PSS_LOCAL], self.ALGO,
+                                   self.USE_TAP_FILE, [self.TAP_FILE], BLOCK_LEN = 256)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
         cocotb.start_soon(self.model_clk(CLK_PERIOD_NS, 'ns'))
 
@@ -125,15 +132,22 @@ async def simple_test(dut):
     print(f'max correlation is {received[ssb_start]} at {ssb_start}')
 
     print(f'max model-hdl difference is {max(np.abs(received - received_model))}')
-    if tb.ALGO == 0:
-        #ok_limit = 0.0001
-        #for i in range(len(received)):
-        #    assert np.abs((received[i] - received_model[i]) / received[i]) < ok_limit
-        for i in range(len(received)):
-            assert received[i] == received_model[i]
-    else:
-        # there is not yet a model for ALGO=1
-        pass
+    #ok_limit = 0.0001
+    #for i in range(len(received)):
+    #    assert np.abs((received[i] - received_model[i]) / received[i]) < ok_limit
+    for i in range(len(received)):
+        assert received[i] == received_model[i]
+    result_batch, valid_batch = tb.model.correlate(waveform[:num_items])
+    assert np.array_equal(result_batch[valid_batch], received)
+    # results of the streaming API must not depend on the chunk sizes
+    tb.model.reset()
+    # the split at 100 twice gives an empty chunk
+    chunks = np.array_split(waveform[:num_items], [1, 100, 100, 227, 355])
+    received_chunked = np.concatenate(list(tb.model.stream(chunks)))
+    assert np.array_equal(received_chunked, received[:len(received_chunked)])
+    # FFT candidates are verified with the direct form, so the peak has to be bit-exact
+    peaks = tb.fft_model.find_peaks(waveform[:num_items], received[ssb_start] - 1)
+    assert (ssb_start, 0, received[ssb_start]) in peaks
 
     assert ssb_start == 412
     assert len(received) == num_items
@@ -47,6 +47,12 @@ class TB(object):
         spec.loader.exec_module(foo)
         self.model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, self.PSS_LOCAL, ALGO = 0)
 
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/PSS_correlator_mr.py'))
+        spec = importlib.util.spec_from_file_location('PSS_correlator_mr', model_dir)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.mr_model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, self.PSS_LOCAL, self.MULT_REUSE)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
         cocotb.start_soon(self.model_clk(CLK_PERIOD_NS, 'ns'))
 
@@ -156,6 +162,12 @@ async def simple_test(dut):
     for i in range(len(received)):
         assert received[i] == received_model[i]
 
+    # the multiplier-reuse model also reproduces C0 and C1 exactly
+    received_mr_model, C0_model, C1_model = tb.mr_model.correlate(waveform[:num_items], SAMPLE_INTERVAL = clk_decimation)
+    assert np.array_equal(received_mr_model[128:], received)
+    assert np.array_equal(C0_model, C0)
+    assert np.array_equal(C1_model, C1)
+
     prod = C0[ssb_start+128] * np.conj(C1[ssb_start+128])
     # detectedCFO = np.arctan2(prod.imag, prod.real)
     detectedCFO = np.angle(prod)
@@ -32,6 +32,7 @@ class TB(object):
         self.PSS_LOCAL = int(dut.PSS_LOCAL.value)
         self.ALGO = int(dut.ALGO.value)
         self.WINDOW_LEN = int(dut.WINDOW_LEN.value)
+        self.DETECTION_SHIFT = int(dut.DETECTION_SHIFT.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
@@ -47,7 +48,7 @@ class TB(object):
         spec = importlib.util.spec_from_file_location('peak_detector', model_file)
         foo = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(foo)
-        self.peak_detector_model = foo.Model(self.OUT_DW, self.WINDOW_LEN)
+        self.peak_detector_model = foo.Model(self.OUT_DW, self.WINDOW_LEN, NOISE_LIMIT = 0, DETECTION_SHIFT = self.DETECTION_SHIFT)
 
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
         cocotb.start_soon(self.model_clk(CLK_PERIOD_NS, 'ns'))
@@ -130,6 +131,15 @@ async def simple_test(dut):
     print(f'highest peak at {peak_pos}')
     assert peak_pos == expected_peak_pos
 
+    # the models only see valid samples, so the hdl peaks are delayed by a constant number of clock cycles
+    correlator_result, correlator_valid = tb.PSS_correlator_model.correlate(waveform[:in_counter])
+    peak_detected_model, _, _ = tb.peak_detector_model.detect(correlator_result[correlator_valid])
+    model_peaks = np.flatnonzero(peak_detected_model)
+    hdl_peaks = np.flatnonzero(received)
+    assert len(model_peaks) > 0
+    offset = hdl_peaks[0] - model_peaks[0]
+    assert np.array_equal(hdl_peaks, model_peaks[model_peaks + offset < num_items] + offset)
+
 # bit growth inside PSS_correlator is a lot, be careful to not make OUT_DW too small !
 @pytest.mark.parametrize("ALGO", [0, 1])
 @pytest.mark.parametrize("IN_DW", [32])
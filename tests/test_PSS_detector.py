@@ -45,11 +45,17 @@ class TB(object):
 
         tests_dir = os.path.abspath(os.path.dirname(__file__))
         if self.USE_TAP_FILE:
-            self.TAP_FILE_2 = os.environ["TAP_FILE_2"]
-            self.PSS_LOCAL_2 = 0
+            self.TAP_FILE = [os.environ[f'TAP_FILE_{i}'] for i in range(3)]
+            self.PSS_LOCAL = [0] * 3
         else:
-            self.TAP_FILE_2 = ""
-            self.PSS_LOCAL_2 =  int(dut.PSS_LOCAL_2.value)
+            self.TAP_FILE = [''] * 3
+            self.PSS_LOCAL = [int(getattr(dut, f'PSS_LOCAL_{i}').value) for i in range(3)]
+
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/PSS_correlator_bank.py'))
+        spec = importlib.util.spec_from_file_location('PSS_correlator_bank', model_dir)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.IN_DW, self.OUT_DW, self.TAP_DW, self.PSS_LEN, self.PSS_LOCAL, self.ALGO, self.USE_TAP_FILE, self.TAP_FILE)
 
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
@@ -113,6 +119,11 @@ async def simple_test(dut):
         plt.show()
     assert 430 in received
 
+    scores, detected_N_id_2 = tb.model.correlate(waveform[:in_counter])
+    peak_pos = np.argmax(scores.max(axis = 0))
+    print(f'model peak at {peak_pos} for N_id_2 = {detected_N_id_2[peak_pos]}')
+    assert detected_N_id_2[peak_pos] == 2
+
 # bit growth inside PSS_correlator is a lot, be careful to not make OUT_DW too small !
 @pytest.mark.parametrize("ALGO", [0, 1])
 @pytest.mark.parametrize("IN_DW", [32])
@@ -2,12 +2,14 @@ import numpy as np
 import os
 import pytest
 import logging
+import importlib.util
 import os
 
 import cocotb
 import cocotb_test.simulator
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import RisingEdge, ReadOnly, Event, with_timeout
+from cocotb.utils import get_sim_time
 
 import py3gpp
 
@@ -19,10 +21,17 @@ rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'hdl'))
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
+        self.IN_DW = int(dut.IN_DW.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/SSS_detector.py'))
+        spec = importlib.util.spec_from_file_location('SSS_detector', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.IN_DW)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
     async def cycle_reset(self):
@@ -70,8 +79,77 @@ async def simple_test(dut):
 
     assert detected_N_id_1 == N_id_1
     assert detected_N_id == N_id_1 * 3 + N_id_2
+
+    model_N_id_1, model_N_id, _ = tb.model.detect([int(SSS_seq[i]) * 2 - 1 for i in range(SSS_len)], N_id_2)
+    assert model_N_id_1[0] == detected_N_id_1
+    assert model_N_id[0] == detected_N_id
     # assert dut.m_axis_out_tdata.value == N_id_1
 
+class Monitor(object):
+    """collects the detections of SSS_detector, it only wakes up when m_axis_out_tvalid rises"""
+    def __init__(self, dut):
+        self.dut = dut
+        self.detections = []
+        self.detection_times = []
+        self.event = Event()
+        cocotb.start_soon(self.run())
+
+    async def run(self):
+        while True:
+            await RisingEdge(self.dut.m_axis_out_tvalid)
+            await ReadOnly()
+            self.detections.append((self.dut.m_axis_out_tdata.value.integer, self.dut.N_id_o.value.integer))
+            self.detection_times.append(get_sim_time('ns'))
+            self.event.set()
+
+@cocotb.test()
+async def all_N_id_test(dut):
+    """streams the SSS of all N_id back to back through one simulation and compares with the model"""
+    tb = TB(dut)
+    dut.N_id_2_valid_i.value = 0
+    await tb.cycle_reset()
+    monitor = Monitor(dut)
+
+    SSS_len = 127
+    num_N_id = int(os.environ.get('NUM_N_ID', 1008))
+    sss = tb.model.sss[:num_N_id]
+    N_id_2 = np.arange(num_N_id) % 3
+    data_in = sss  # simple BPSK modulation, like in simple_test
+
+    # give the LFSRs time to fill m_seq_0 and m_seq_1
+    for _ in range(2 * SSS_len):
+        await RisingEdge(dut.clk_i)
+
+    # a detection takes DETECT_CYCLES in STATE_DETECT_SSS, a missing one must not hang the simulation
+    timeout_ns = (tb.model.DETECT_CYCLES + 1000) * CLK_PERIOD_NS
+    start_times = []
+    for N_id in range(num_N_id):
+        monitor.event.clear()
+        dut.N_id_2_i.value = int(N_id_2[N_id])
+        dut.N_id_2_valid_i.value = 1
+        await RisingEdge(dut.clk_i)
+        dut.N_id_2_valid_i.value = 0
+        start_times.append(get_sim_time('ns'))
+        for i in range(SSS_len):
+            dut.s_axis_in_tvalid.value = 1
+            dut.s_axis_in_tdata.value = int(data_in[N_id, i])
+            await RisingEdge(dut.clk_i)
+        dut.s_axis_in_tvalid.value = 0
+        await with_timeout(monitor.event.wait(), timeout_ns, 'ns')
+        await RisingEdge(dut.clk_i)
+
+    model_N_id_1, model_N_id, _ = tb.model.detect([[int(val) for val in row] for row in data_in], N_id_2)
+    assert len(monitor.detections) == num_N_id
+    assert [N_id_1 for N_id_1, _ in monitor.detections] == list(model_N_id_1)
+    assert [N_id for _, N_id in monitor.detections] == list(model_N_id)
+    assert list(model_N_id) == list(range(num_N_id))
+
+    cycles = (np.array(monitor.detection_times) - np.array(start_times)) / CLK_PERIOD_NS
+    total_cycles = (monitor.detection_times[-1] - start_times[0]) / CLK_PERIOD_NS
+    print(f'{num_N_id} detections in {total_cycles:.0f} clock cycles, '
+          f'{np.mean(cycles):.1f} cycles per detection (min {np.min(cycles):.0f}, max {np.max(cycles):.0f}, '
+          f'{tb.model.DETECT_CYCLES} in STATE_DETECT_SSS)')
+
 @pytest.mark.parametrize("N_ID_1", [0, 335])
 @pytest.mark.parametrize("N_ID_2", [0, 1, 2])
 def test(N_ID_1, N_ID_2):
@@ -103,5 +181,36 @@ def test(N_ID_1, N_ID_2):
         force_compile=True
     )
 
+# all 1008 N_id take about 43M clock cycles, QUICK_SSS_SWEEP=1 only detects the first 6 N_id for local runs
+def test_all_N_id():
+    NUM_N_ID = 6 if os.environ.get('QUICK_SSS_SWEEP') == '1' else 1008
+    dut = 'SSS_detector'
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f'{dut}.sv'),
+        os.path.join(rtl_dir, 'LFSR/LFSR.sv')
+    ]
+    parameters = {}
+    parameters['IN_DW'] = 32
+
+    compile_args = []
+    if os.environ.get('SIM') == 'verilator':
+        compile_args = ['--no-timing', '-Wno-fatal']
+
+    sim_build='sim_build/SSS_detector_all_N_id_' + '_'.join(('{}={}'.format(*i) for i in parameters.items()))
+    cocotb_test.simulator.run(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env={'NUM_N_ID': str(NUM_N_ID)},
+        testcase='all_N_id_test',
+        compile_args=compile_args
+    )
+
 if __name__ == '__main__':
     test(N_ID_1 = 335, N_ID_2 = 1)
@@ -2,6 +2,7 @@ import numpy as np
 import os
 import pytest
 import logging
+import importlib.util
 import matplotlib.pyplot as plt
 import os
 
@@ -27,10 +28,17 @@ class TB(object):
         self.dut = dut
         self.INPUT_WIDTH = int(dut.INPUT_WIDTH.value)
         self.OUTPUT_WIDTH = int(dut.OUTPUT_WIDTH.value)
+        self.LUT_DW = int(dut.LUT_DW.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/atan2.py'))
+        spec = importlib.util.spec_from_file_location('atan2', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.INPUT_WIDTH, self.LUT_DW, self.OUTPUT_WIDTH)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
     async def cycle_reset(self):
@@ -60,6 +68,15 @@ async def simple_test(dut):
     denominator[0] = MAX_VAL
     numerator[1] = 0
     denominator[1] = -MAX_VAL
+    MIN_VAL = -MAX_VAL - 1
+    corner_cases = [(MAX_VAL, 0), (-MAX_VAL, 0), (0, 0), (MAX_VAL, MAX_VAL), (-MAX_VAL, -MAX_VAL), (MAX_VAL, -MAX_VAL),
+                    (MIN_VAL, 0), (0, MIN_VAL), (MIN_VAL, MIN_VAL), (MIN_VAL, MAX_VAL), (1, MIN_VAL), (-1, -1)]
+    # the float comparison is skipped for these, because the HDL does not handle 0 / 0 and
+    # the wrap around of the last LUT entry for large OUTPUT_WIDTH
+    for i, (num, den) in enumerate(corner_cases):
+        numerator[max_rx_cnt - len(corner_cases) + i] = num
+        denominator[max_rx_cnt - len(corner_cases) + i] = den
+    expected_model = tb.model.angle(numerator, denominator)
 
     tx_cnt = 0
     expected_results = []
@@ -85,7 +102,9 @@ async def simple_test(dut):
             if (dut.valid_o.value == 1):
                 result = _twos_comp(dut.angle_o.value.integer, tb.OUTPUT_WIDTH) / PI * 180
                 print(f'atan2({numerator[rx_cnt]} / {denominator[rx_cnt]}) = {result:.3f}  expected {np.arctan2(numerator[rx_cnt], denominator[rx_cnt]) / np.pi * 180:.3f}')
-                assert np.abs(np.abs(np.arctan2(numerator[rx_cnt], denominator[rx_cnt]) / np.pi * 180) - np.abs(result)) < 0.1
+                if rx_cnt < max_rx_cnt - len(corner_cases):
+                    assert np.abs(np.abs(np.arctan2(numerator[rx_cnt], denominator[rx_cnt]) / np.pi * 180) - np.abs(result)) < 0.1
+                assert _twos_comp(dut.angle_o.value.integer, tb.OUTPUT_WIDTH) == expected_model[rx_cnt]
                 rx_cnt += 1
 
                 if rx_cnt < max_rx_cnt:
@@ -114,10 +133,12 @@ async def simple_test(dut):
                 result = _twos_comp(dut.angle_o.value.integer, tb.OUTPUT_WIDTH) / PI * 180
                 print(f'atan2({numerator[rx_cnt]} / {denominator[rx_cnt]}) = {result:.3f}  expected {expected_results[rx_cnt] / np.pi * 180:.3f}')
                 # assert np.abs(np.abs(result) - np.abs(expected_results[rx_cnt] / np.pi * 180)) < 0.1
+                assert _twos_comp(dut.angle_o.value.integer, tb.OUTPUT_WIDTH) == expected_model[rx_cnt]
                 rx_cnt += 1
 
     if clk_cnt == max_clk_cnt:
         print("no result received!")
+    assert rx_cnt == max_rx_cnt
     
 
 @pytest.mark.parametrize("INPUT_WIDTH", [16, 32])
@@ -13,6 +13,7 @@ from cocotb.triggers import RisingEdge
 
 import py3gpp
 import sigmf
+import importlib.util
 
 CLK_PERIOD_NS = 8
 CLK_PERIOD_S = CLK_PERIOD_NS * 0.000000001
@@ -25,12 +26,33 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+# model/complex_multiplier.py and model/dds.py are not checked against the sources of the complex_multiplier and DDS
+# submodules yet, a mismatch with the model only fails the test with EXACT_SUBMODULE_MODELS=1, the tolerance checks always apply
+EXACT_SUBMODULE_MODELS = os.environ.get('EXACT_SUBMODULE_MODELS') == '1'
+
+def _check_model(match, message):
+    if EXACT_SUBMODULE_MODELS:
+        assert match, message
+    elif not match:
+        logging.getLogger('cocotb.tb').warning(message)
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
 
         self.IN_DW = int(dut.IN_DW.value)
 
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/channel_estimator.py'))
+        spec = importlib.util.spec_from_file_location('channel_estimator', model_dir)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.IN_DW)
+
+        model_dir = os.path.abspath(os.path.join(tests_dir, '../model/lfsr.py'))
+        spec = importlib.util.spec_from_file_location('lfsr', model_dir)
+        self.lfsr = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.lfsr)
+
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
@@ -66,13 +88,17 @@ async def simple_test(dut):
     PBCH_DMRS = []
     ibar_SSB = 2
     PBCH_DMRS_model = py3gpp.nrPBCHDMRS(N_id, ibar_SSB)*np.sqrt(2)
+    tb.model.set_N_id(N_id)
+    PBCH_DMRS_table = tb.model.pilots(ibar_SSB)
     while cycle_counter < max_wait_cycles:
         await RisingEdge(dut.clk_i)
         if dut.debug_PBCH_DMRS_valid_o.value == 1:
             PBCH_DMRS.append(1j*(1-2*(dut.debug_PBCH_DMRS_o.value % 2)) + (1-2*((dut.debug_PBCH_DMRS_o.value >> 1) % 2)))
             # print(f'PBCH_DMRS[{len(PBCH_DMRS)-1}] = {PBCH_DMRS[len(PBCH_DMRS)-1]}  <->  {PBCH_DMRS_model[len(PBCH_DMRS)-1]}')
             assert PBCH_DMRS[len(PBCH_DMRS)-1] == PBCH_DMRS_model[len(PBCH_DMRS)-1]
+            assert dut.debug_PBCH_DMRS_o.value.integer == PBCH_DMRS_table[len(PBCH_DMRS)-1]
         cycle_counter += 1
+    assert len(PBCH_DMRS) == len(PBCH_DMRS_table)
     
 @cocotb.test()
 async def simple_test2(dut):
@@ -263,6 +289,19 @@ async def simple_test3(dut):
     print(f'finished after {clk_cnt} clk cycles')
     print(f'received {corrected_PBCH_sym_cnt} PBCH messages')
 
+    # compare detected ibar_SSB and the corrected PBCH subcarriers with the model
+    tb.model.set_N_id(N_id)
+    in_tuser = np.array([(i + START_SYMBOL) in SSB_pattern for i in range(num_symbols)], int)
+    model_ibar_SSB, _, _ = tb.model.detect_ibar(symbol[in_tuser == 1, SC_START:FFT_LEN - SC_START])
+    _check_model(list(model_ibar_SSB) == ibar_SSBs, 'ibar_SSB does not match the channel_estimator model!')
+    tb.model.reset()
+    model_re, model_im, model_tuser, _ = tb.model.process(symbol[:, SC_START:FFT_LEN - SC_START], in_tuser)
+    model_PBCH = (model_re + 1j * model_im)[model_tuser == 1]
+    assert len(model_PBCH) == corrected_PBCH_sym_cnt * 432
+    received_PBCH = corrected_PBCH[:corrected_PBCH_sym_cnt].ravel()
+    _check_model(np.array_equal(model_PBCH, received_PBCH), 'corrected PBCH does not match the channel_estimator model!')
+    assert max(np.abs(received_PBCH - model_PBCH)) < max(np.abs(received_PBCH)) * 0.01
+
     # try to decode PBCH
     for i in range(corrected_PBCH_sym_cnt):
         ibar_SSB = ibar_SSBs[i]
@@ -275,6 +314,7 @@ async def simple_test3(dut):
             E = 864
             v = ibar_SSB
             scrambling_seq = py3gpp.nrPBCHPRBS(N_id, v, E)
+            assert np.array_equal(scrambling_seq, tb.lfsr.pbch_prbs(N_id, v, E)[0])
             scrambling_seq_bpsk = (-1)*scrambling_seq*2 + 1
             pbchBits_descrambled = pbchBits * scrambling_seq_bpsk
 
@@ -2,6 +2,7 @@ import numpy as np
 import os
 import pytest
 import logging
+import importlib.util
 import matplotlib.pyplot as plt
 import os
 
@@ -32,6 +33,12 @@ class TB(object):
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/div.py'))
+        spec = importlib.util.spec_from_file_location('div', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.INPUT_WIDTH, self.RESULT_WIDTH, self.PIPELINED)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
 
     async def cycle_reset(self):
@@ -72,6 +79,7 @@ async def simple_test(dut):
             result = dut.result_o.value.integer
             # print(f'{numerator} / {denominator} = {result}')
             assert np.floor(numerator / denominator) == result
+            assert tb.model.divide([numerator], [denominator])[0] == result
             rx_cnt += 1
 
             numerator = np.random.randint(0, 2**(tb.INPUT_WIDTH) - 1)
@@ -86,6 +94,51 @@ async def simple_test(dut):
         print("no result received!")
     
 
+@cocotb.test()
+async def stream_test(dut):
+    """streams NUM_OPS operand pairs as fast as the core accepts them and compares with the model"""
+    tb = TB(dut)
+
+    dut.valid_i.value = 0
+    await tb.cycle_reset()
+
+    num_ops = int(os.environ.get('NUM_OPS', 10000))
+    rng = np.random.default_rng(1)
+    numerator = rng.integers(0, 2 ** tb.INPUT_WIDTH - 1, num_ops, dtype = np.uint64)
+    denominator = rng.integers(1, 2 ** tb.INPUT_WIDTH - 1, num_ops, dtype = np.uint64)
+    # small denominators give results that saturate at RESULT_WIDTH bits
+    denominator >>= rng.integers(0, tb.INPUT_WIDTH, num_ops).astype(np.uint64)
+    numerator[:3] = 0
+    denominator[3:6] = 0
+    expected = tb.model.divide(numerator, denominator)
+    busy = tb.model.busy_cycles(numerator, denominator)
+
+    received = []
+    tx_cnt = 0
+    wait_cnt = 0
+    clk_cnt = 0
+    max_clk_cnt = int(np.sum(busy)) + tb.model.LATENCY + 100
+    while (len(received) < num_ops) and (clk_cnt < max_clk_cnt):
+        if (tx_cnt < num_ops) and (wait_cnt == 0):
+            dut.numerator_i.value = int(numerator[tx_cnt])
+            dut.denominator_i.value = int(denominator[tx_cnt])
+            dut.valid_i.value = 1
+            wait_cnt = int(busy[tx_cnt])
+            tx_cnt += 1
+        else:
+            dut.valid_i.value = 0
+        await RisingEdge(dut.clk_i)
+        clk_cnt += 1
+        wait_cnt = max(wait_cnt - 1, 0)
+        if dut.valid_o.value == 1:
+            received.append(dut.result_o.value.integer)
+
+    print(f'{len(received)} results in {clk_cnt} clock cycles = {len(received) / clk_cnt:.3f} ops/cycle')
+    assert len(received) == num_ops
+    assert np.array_equal(np.array(received, dtype = expected.dtype), expected)
+    if tb.PIPELINED:
+        assert clk_cnt <= num_ops + tb.model.LATENCY + 4
+
 @pytest.mark.parametrize("INPUT_WIDTH", [16, 32])
 @pytest.mark.parametrize("RESULT_WIDTH", [16, 32])
 @pytest.mark.parametrize("PIPELINED", [0, 1])
@@ -119,5 +172,38 @@ def test(INPUT_WIDTH, RESULT_WIDTH, PIPELINED):
         waves=True
     )
 
+@pytest.mark.parametrize("INPUT_WIDTH", [16, 32])
+@pytest.mark.parametrize("RESULT_WIDTH", [16, 32])
+@pytest.mark.parametrize("PIPELINED", [0, 1])
+def test_stream(INPUT_WIDTH, RESULT_WIDTH, PIPELINED, NUM_OPS = 10000):
+    dut = 'div'
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f'{dut}.sv')
+    ]
+
+    parameters = {}
+    parameters['INPUT_WIDTH'] = INPUT_WIDTH
+    parameters['RESULT_WIDTH'] = RESULT_WIDTH
+    parameters['PIPELINED'] = PIPELINED
+    os.environ['NUM_OPS'] = str(NUM_OPS)
+
+    # the build is reused, the batch size can be changed without compiling again
+    sim_build='sim_build/div_stream_' + '_'.join(('{}={}'.format(*i) for i in parameters.items()))
+    cocotb_test.simulator.run(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env={'NUM_OPS': str(NUM_OPS)},
+        testcase='stream_test',
+        force_compile=False,
+        waves=False
+    )
+
 if __name__ == '__main__':
     test(INPUT_WIDTH = 16, RESULT_WIDTH = 16, PIPELINED = 1)
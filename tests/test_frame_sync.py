@@ -2,6 +2,7 @@ import numpy as np
 import os
 import pytest
 import logging
+import importlib.util
 import os
 import scipy
 import matplotlib.pyplot as plt
@@ -24,6 +25,13 @@ class TB(object):
         self.dut = dut
 
         self.IN_DW = int(dut.IN_DW.value)
+        self.NFFT = int(dut.NFFT.value)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/frame_sync.py'))
+        spec = importlib.util.spec_from_file_location('frame_sync', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.model = foo.Model(self.NFFT)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
@@ -52,29 +60,17 @@ async def stream_tb(dut):
     waveform *= 2 ** (tb.IN_DW // 2 - 1)
     waveform = waveform.real.astype(int) + 1j*waveform.imag.astype(int)
 
-    CP1_LEN = 20
-    CP2_LEN = 18
-    FFT_LEN = 256
-    L_MAX = 4 # 4 SSBs
-    SSB_pattern = [2, 8, 16, 22]  # case A
-
     START_POS = 842  #+ int(3.84e6 * 0.001 * int(ibar_SSB / 2)) + 1646 * (ibar_SSB % 2)   # this hack works for ibar_SSB = 0 .. 3
     SSB_POS = [842, 842 + int(3.84e6 * 0.02)]
-    START_SYMBOL = 2
     num_symbols = 50
-    symbol = np.empty((num_symbols,256), 'complex')
+    schedule = tb.model.schedule(len(waveform), [START_POS])[:num_symbols]
+    symbol, _ = tb.model.symbols(waveform, schedule)
+    symbol = np.fft.fftshift(np.fft.fft(symbol, axis = 1), axes = 1)
 
-    pos = START_POS
     _, axs = plt.subplots(8, 7, sharex=True, sharey=True)
     axs = np.ravel(axs)
     for i in range(num_symbols):
-        new_symbol = np.fft.fftshift(np.fft.fft(waveform[pos:][:FFT_LEN]))
-        if (i+4)%7 == 0:
-            pos += CP1_LEN + FFT_LEN
-        else:
-            pos += CP2_LEN + FFT_LEN
-        axs[i].plot(new_symbol.real, new_symbol.imag, '.r')
-        symbol[i] = new_symbol
+        axs[i].plot(symbol[i].real, symbol[i].imag, '.r')
     # plt.show()
 
     symbol /= max(symbol.real.max(), symbol.imag.max())
@@ -83,20 +79,16 @@ async def stream_tb(dut):
 
     max_clk_cnt = int(3.84e6 * 0.025)  # 25ms
     clk_cnt = 0
-    symbol_id = 0
-    SC_cnt = 0
     pos = 0
-    current_CP_len = CP2_LEN
     ibar_SSB_DEALAY = 1000
+    out_valid = []
+    out_user = []
+    out_last = []
     while clk_cnt < max_clk_cnt:
         await RisingEdge(dut.clk_i)
 
         if pos in SSB_POS:
             dut.N_id_2_valid_i.value = 1
-            # assume SSB arrives at symbol 3
-            current_CP_len = CP2_LEN
-            SC_cnt = 0
-            symbol_id = START_SYMBOL + 1 # +1 because PSS is not included
             print(f'sending SSB at pos = {pos}')
         else:
             dut.N_id_2_valid_i.value = 0
@@ -112,27 +104,25 @@ async def stream_tb(dut):
         dut.s_axis_in_tdata.value = data
         dut.s_axis_in_tvalid.value = 1
 
-        if SC_cnt == (256 + current_CP_len):
-            symbol_id += 1
-            symbol_id %= 14
-            SC_cnt = 0
-            if symbol_id in [0, 7]:
-                current_CP_len = CP1_LEN
-            else:
-                current_CP_len = CP2_LEN
-            print(f'send symbol {symbol_id}')
-        else:
-            SC_cnt += 1
-
         if pos == SSB_POS[1] + 2:
             assert dut.SSB_start_o.value == 1
 
         if dut.SSB_start_o.value == 1:
             print(f'SSB_start at pos = {pos}')
+        out_valid.append(dut.m_axis_out_tvalid.value.integer)
+        out_user.append(dut.m_axis_out_tuser.value.integer)
+        out_last.append(dut.m_axis_out_tlast.value.integer)
         clk_cnt += 1
         pos += 1
     print(f'finished after {clk_cnt} clk cycles')
 
+    # the outputs that are read in iteration pos belong to input sample pos - 3
+    model_valid, model_user, model_last = tb.model.stream(pos - 3, SSB_POS)
+    out_valid = np.array(out_valid[3:], bool)
+    assert np.array_equal(out_valid, model_valid)
+    assert np.array_equal(np.array(out_user[3:])[out_valid], model_user[model_valid])
+    assert np.array_equal(np.array(out_last[3:], bool), model_last)
+
 
 @pytest.mark.parametrize("IN_DW", [32])
 def test_stream(IN_DW):
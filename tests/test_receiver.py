@@ -26,6 +26,16 @@ def _twos_comp(val, bits):
         val = val - (1 << bits)
     return int(val)
 
+# model/fft.py and model/complex_multiplier.py are not checked against the sources of the FFT and complex_multiplier
+# submodules yet, a mismatch with the FFT_demod model only fails the test with EXACT_SUBMODULE_MODELS=1
+EXACT_SUBMODULE_MODELS = os.environ.get('EXACT_SUBMODULE_MODELS') == '1'
+
+def _check_model(match, message):
+    if EXACT_SUBMODULE_MODELS:
+        assert match, message
+    elif not match:
+        logging.getLogger('cocotb.tb').warning(message)
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
@@ -38,10 +48,48 @@ class TB(object):
         self.LLR_DW = int(dut.LLR_DW.value)
         self.NFFT = int(dut.NFFT.value)
         self.MULT_REUSE = int(dut.MULT_REUSE.value)
+        self.USE_TAP_FILE = int(dut.USE_TAP_FILE.value)
 
         self.log = logging.getLogger('cocotb.tb')
         self.log.setLevel(logging.DEBUG)
 
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/SSS_detector.py'))
+        spec = importlib.util.spec_from_file_location('SSS_detector', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.SSS_detector_model = foo.Model(self.OUT_DW)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/demap.py'))
+        spec = importlib.util.spec_from_file_location('demap', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        FFT_OUT_DW = 16  # localparam of receiver.sv
+        self.demap_model = foo.Model(FFT_OUT_DW // 2, self.LLR_DW)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/ressource_grid_framer.py'))
+        spec = importlib.util.spec_from_file_location('ressource_grid_framer', model_file)
+        self.ressource_grid_framer = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.ressource_grid_framer)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/BWP_extractor.py'))
+        spec = importlib.util.spec_from_file_location('BWP_extractor', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.BWP_extractor_model = foo.Model(FFT_OUT_DW, self.NFFT)
+
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/frame_sync.py'))
+        spec = importlib.util.spec_from_file_location('frame_sync', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.frame_sync_model = foo.Model(self.NFFT)
+
+        # the tap file is read from the sim_build folder, like $readmemh in FFT_demod
+        model_file = os.path.abspath(os.path.join(tests_dir, '../model/FFT_demod.py'))
+        spec = importlib.util.spec_from_file_location('FFT_demod', model_file)
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        self.FFT_demod_model = foo.Model(self.IN_DW, self.HALF_CP_ADVANCE, FFT_OUT_DW, self.NFFT, USE_TAP_FILE = self.USE_TAP_FILE)
+
         cocotb.start_soon(Clock(self.dut.clk_i, CLK_PERIOD_NS, units='ns').start())
         cocotb.start_soon(Clock(self.dut.sample_clk_i, CLK_PERIOD_NS, units='ns').start())  # TODO make sample_clk_i 3.84 MHz and clk_i 100 MHz
 
@@ -191,28 +239,22 @@ async def simple_test(dut):
     received_PBCH = []
     received_SSS = []
     corrected_PBCH = []
+    corrected_PBCH_raw = []
     received_PBCH_LLR = []
     received_N_ids = []
     received_ibar_SSB = []
-    if NFFT == 8:
-        N_PRB = 20
-    elif NFFT == 9:
-        N_PRB = 25
-    SYMBOLS_PER_PRB = 12
+    PSS_out = []
+    received_demod = []
     FFT_OUT_DW = 16
-    SYMBOL_LEN = N_PRB * SYMBOLS_PER_PRB
-    N_PRB_PBCH = 20
-    PBCH_SYMBOL_LEN = N_PRB_PBCH * SYMBOLS_PER_PRB
+    SYMBOL_LEN = tb.BWP_extractor_model.BWP_LEN
+    PBCH_SYMBOL_LEN = tb.BWP_extractor_model.PBCH_LEN
     NUM_TIMESTAMP_SAMPLES = 64 // FFT_OUT_DW
     RGS_TRANSFER_LEN = SYMBOL_LEN + NUM_TIMESTAMP_SAMPLES + 1
     print(RGS_TRANSFER_LEN)
-    received_rgs = np.zeros((1, RGS_TRANSFER_LEN), 'complex')
-    num_rgs_symbols = 0
-    rgs_sc_idx = 0
-    HALF_CP_ADVANCE = tb.HALF_CP_ADVANCE
-    CP2_LEN = 18 * FFT_LEN // 256
-    SSS_LEN = 127
-    SSS_START = FFT_LEN // 2 - (SSS_LEN + 1) // 2
+    rgs_words = []
+    rgs_last = []
+    SSS_LEN = tb.BWP_extractor_model.SSS_LEN
+    SSS_START = tb.BWP_extractor_model.SSS_START
     clk_div = 0
     tx_cnt = 0
     sample_cnt = 0
@@ -244,6 +286,8 @@ async def simple_test(dut):
         if dut.peak_detected_debug_o.value.integer:
             received.append(sample_cnt)
             print(f'peak pos = {sample_cnt}')
+        if dut.m_axis_PSS_out_tvalid.value.integer:
+            PSS_out.append(dut.m_axis_PSS_out_tdata.value.integer)
         sample_cnt += dut.m_axis_PSS_out_tvalid.value.integer
 
         if dut.N_id_valid_o.value.integer:
@@ -258,6 +302,7 @@ async def simple_test(dut):
 
         if dut.m_axis_cest_out_tvalid.value == 1 and ((dut.m_axis_cest_out_tuser.value & 0x03) == 1):
             blk_exp = dut.m_axis_cest_out_tuser.value.integer >> 2
+            corrected_PBCH_raw.append(dut.m_axis_cest_out_tdata.value.integer)
             corrected_PBCH.append((_twos_comp(dut.m_axis_cest_out_tdata.value.integer & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)
                 + 1j * _twos_comp((dut.m_axis_cest_out_tdata.value.integer >> (FFT_OUT_DW//2)) & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)) / (2 ** blk_exp))
 
@@ -271,20 +316,14 @@ async def simple_test(dut):
             received_SSS.append(_twos_comp(dut.m_axis_demod_out_tdata.value.integer & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)
                 + 1j * _twos_comp((dut.m_axis_demod_out_tdata.value.integer >> (FFT_OUT_DW//2)) & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2))
 
-        if dut.m_axis_out_tvalid.value.integer:
-            if rgs_sc_idx < 1 + NUM_TIMESTAMP_SAMPLES:
-                received_rgs[num_rgs_symbols, rgs_sc_idx] = dut.m_axis_out_tdata.value.integer
-            else:
-                received_rgs[num_rgs_symbols, rgs_sc_idx] = _twos_comp(dut.m_axis_out_tdata.value.integer & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2) \
-                    + 1j * _twos_comp((dut.m_axis_out_tdata.value.integer >> (FFT_OUT_DW//2)) & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)
+        if dut.m_axis_demod_out_tvalid.value.integer:
+            received_demod.append(_twos_comp(dut.m_axis_demod_out_tdata.value.integer & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2)
+                + 1j * _twos_comp((dut.m_axis_demod_out_tdata.value.integer >> (FFT_OUT_DW//2)) & (2**(FFT_OUT_DW//2) - 1), FFT_OUT_DW//2))
 
+        if dut.m_axis_out_tvalid.value.integer:
             if dut.m_axis_out_tlast.value.integer:
-                num_rgs_symbols += 1
-                assert rgs_sc_idx == RGS_TRANSFER_LEN - 1, print('Error: wrong received number of bytes from ressource_grid_subscriber!')
-                rgs_sc_idx = 0
-                received_rgs = np.vstack((received_rgs, np.zeros((1, RGS_TRANSFER_LEN), 'complex')))
-            else:
-                rgs_sc_idx += 1
+                rgs_last.append(len(rgs_words))
+            rgs_words.append(dut.m_axis_out_tdata.value.integer)
 
     print(f'received {len(corrected_PBCH)} PBCH IQ samples')
     print(f'received {len(received_PBCH_LLR)} PBCH LLRs samples')
@@ -292,6 +331,8 @@ async def simple_test(dut):
     assert len(corrected_PBCH) == 432 * (N_SSBs - 1), print('received PBCH does not have correct length!')
     assert len(received_PBCH_LLR) == 432 * 2 * (N_SSBs - 1), print('received PBCH LLRs do not have correct length!')
     assert not np.array_equal(np.array(received_PBCH_LLR), np.zeros(len(received_PBCH_LLR)))
+    model_PBCH_LLR, _, _ = tb.demap_model.demap(corrected_PBCH_raw)
+    assert np.array_equal(np.array(received_PBCH_LLR), model_PBCH_LLR), print('PBCH LLRs do not match the demap model!')
     assert received_ibar_SSB[0] == expected_ibar_SSB, print('wrong ibar_SSB detected!')
 
     fifo_data = []
@@ -318,10 +359,37 @@ async def simple_test(dut):
     assert not np.array_equal(np.array(fifo_data), np.zeros(len(fifo_data)))
     assert np.array_equal(np.array(received_PBCH_LLR)[:864 * 2], np.array(fifo_data))
 
-    rx_ADC_data = waveform[received[0] + CP2_LEN + FFT_LEN - 1:][:MAX_TX]
-    CP_ADVANCE = CP2_LEN // 2 if HALF_CP_ADVANCE else CP2_LEN
-    ideal_SSS_sym = np.fft.fftshift(np.fft.fft(rx_ADC_data[CP2_LEN + FFT_LEN + CP_ADVANCE:][:FFT_LEN]))
-    ideal_SSS_sym *= np.exp(1j * ( 2 * np.pi * (CP2_LEN - CP_ADVANCE) / FFT_LEN * np.arange(FFT_LEN) + np.pi * (CP2_LEN - CP_ADVANCE)))
+    # verify FFT_demod, the frame_sync model selects the symbols from the PSS_detector output
+    sched = tb.frame_sync_model.schedule(len(PSS_out), received)
+    # jumps for early or late SSBs are not modeled, only the symbols before the first one are compared
+    regular = sched['length'] == sched['CP_len'] + FFT_LEN
+    sched = sched[:np.argmin(regular) if not np.all(regular) else len(sched)]
+    PSS_out = np.array(PSS_out, np.int64)
+    symbols = [PSS_out[start:][:CP_len + FFT_LEN] for start, CP_len in zip(sched['start'], sched['CP_len'])]
+    demod_re, demod_im, demod_tuser = tb.FFT_demod_model.process(symbols, sched['tuser'])
+    demod = demod_re + 1j * demod_im
+    num_demod_symbols = min(len(sched), len(received_demod) // SYMBOL_LEN)
+    print(f'comparing {num_demod_symbols} FFT_demod symbols with the model')
+    assert num_demod_symbols > 0
+    demod = demod[:num_demod_symbols]
+    demod_tuser = demod_tuser[:num_demod_symbols]
+
+    BWP_out, BWP_tuser, _ = tb.BWP_extractor_model.process(demod, demod_tuser)
+    _check_model(np.array_equal(np.array(received_demod[:num_demod_symbols * SYMBOL_LEN]), BWP_out.ravel()),
+        'FFT_demod output does not match the model!')
+
+    # verify BWP_extractor with the captured subcarriers, so that it does not depend on the FFT_demod model
+    captured_BWP = np.array(received_demod[:num_demod_symbols * SYMBOL_LEN]).reshape(num_demod_symbols, SYMBOL_LEN)
+    captured_demod = np.zeros((num_demod_symbols, FFT_LEN), complex)
+    captured_demod[:, tb.BWP_extractor_model.SC_START:tb.BWP_extractor_model.SC_END] = captured_BWP
+    model_PBCH = tb.BWP_extractor_model.PBCH(captured_demod, demod_tuser)
+    model_SSS = tb.BWP_extractor_model.SSS(captured_demod, demod_tuser)
+    assert len(model_PBCH) > 0 and len(model_SSS) > 0
+    assert np.array_equal(np.array(received_PBCH[:len(model_PBCH)]), model_PBCH), print('PBCH_valid_o samples do not match the model!')
+    assert np.array_equal(np.array(received_SSS[:len(model_SSS)]), model_SSS), print('SSS_valid_o samples do not match the model!')
+
+    SSS_sym = np.flatnonzero((sched['subframe'] == 0) & (sched['symbol'] == 4))[0]
+    ideal_SSS_sym = demod[SSS_sym]
     ideal_SSS = ideal_SSS_sym[SSS_START:][:SSS_LEN]
     if 'PLOTS' in os.environ and os.environ['PLOTS'] == '1':
         ax = plt.subplot(2, 4, 1)
@@ -354,10 +422,7 @@ async def simple_test(dut):
         ax.plot(np.real(received_SSS[SSS_LEN:][:SSS_LEN]), np.imag(received_SSS[:SSS_LEN]), 'b.')
         plt.show()
 
-    received_PBCH_ideal = np.fft.fftshift(np.fft.fft(rx_ADC_data[CP_ADVANCE:][:FFT_LEN]))
-    received_PBCH_ideal *= np.exp(1j * ( 2 * np.pi * (CP2_LEN - CP_ADVANCE) / FFT_LEN * np.arange(FFT_LEN) + np.pi * (CP2_LEN - CP_ADVANCE)))
-    received_PBCH_ideal = received_PBCH_ideal[8:][:PBCH_SYMBOL_LEN]
-    received_PBCH_ideal = (received_PBCH_ideal.real.astype(int) + 1j * received_PBCH_ideal.imag.astype(int))
+    received_PBCH_ideal = demod[SSS_sym - 1][tb.BWP_extractor_model.PBCH_START:][:PBCH_SYMBOL_LEN]
     if 'PLOTS' in os.environ and os.environ['PLOTS'] == '1':
         _, axs = plt.subplots(1, 3, figsize=(10, 5))
         axs[0].set_title('CFO corrected SSS')
@@ -378,9 +443,6 @@ async def simple_test(dut):
 
     print(f'first peak at {received[0]}')
 
-    scaling_factor = 2 ** (tb.IN_DW + NFFT - tb.OUT_DW) # FFT core is in truncation mode
-    ideal_SSS = ideal_SSS.real / scaling_factor + 1j * ideal_SSS.imag / scaling_factor
-
     # verify PSS_detector
     if os.environ['TEST_FILE'] == '30720KSPS_dl_signal':
         if NFFT == 8:
@@ -407,33 +469,31 @@ async def simple_test(dut):
         assert N_id == expected_N_id, print(f'wrong N_id: expected {expected_N_id} but received {N_id}')
 
     # verify received SSS sequence
-    corr = np.zeros(335)
-    for i in range(335):
-        sss = py3gpp.nrSSS(i * 3 + expected_N_id_2)
-        corr[i] = np.abs(np.vdot(sss, received_SSS[:SSS_LEN]))
+    corr = tb.SSS_detector_model.correlate(received_SSS[:SSS_LEN], expected_N_id_2)[0]
     detected_N_id_1 = np.argmax(corr)
     assert detected_N_id_1 == expected_N_id_1
     detected_N_id = detected_N_id_1 * 3 + expected_N_id_2
 
     # verify received ressource_grid_subscriber
-    def extract_timestamp(packet):
-        ts = 0
-        samples = packet[1:][:NUM_TIMESTAMP_SAMPLES]
-        for i in range(NUM_TIMESTAMP_SAMPLES):
-            ts += int(samples[i].real) << int(FFT_OUT_DW * i)
-        return ts
-
-    timestamp = extract_timestamp(received_rgs[0, :])
-    for i in range(1, num_rgs_symbols):
-        delta_samples = extract_timestamp(received_rgs[i, :]) - timestamp
-        # print(f'delta_samples = {delta_samples}')
-        corr_factor = 2 ** (NFFT - 8)
-        if expect_exact_timing:
-            assert delta_samples in [274 * corr_factor, 276 * corr_factor], print('Error: symbol timestamps don\'t align!') # depending on cp1 or cp2
-        else:
-            if delta_samples not in [274 * corr_factor, 276 * corr_factor]:
-                print(f'timing deviation: delta_samples = {delta_samples}')
-        timestamp = extract_timestamp(received_rgs[i, :])
+    num_rgs_symbols = len(rgs_last)
+    assert np.array_equal(rgs_last, np.arange(1, num_rgs_symbols + 1) * RGS_TRANSFER_LEN - 1), \
+        print('Error: wrong received number of bytes from ressource_grid_subscriber!')
+    rgf = tb.ressource_grid_framer.Model(SYMBOL_LEN, FFT_OUT_DW)
+    received_rgs = rgf.parse_words(rgs_words[:num_rgs_symbols * RGS_TRANSFER_LEN])
+    # the packets contain the BWP_extractor output, blk_exp is m_axis_out_tuser[BLK_EXP_LEN:1]
+    num_model_rgs = min(num_rgs_symbols, len(BWP_tuser))
+    _check_model(np.array_equal(rgf.blk_exp(received_rgs)[:num_model_rgs], (BWP_tuser[:num_model_rgs] >> 1) & (2 ** rgf.BLK_EXP_LEN - 1)),
+        'blk_exp of FFT_demod does not match the model!')
+    assert np.array_equal(rgf.iq(received_rgs[:num_model_rgs]), captured_BWP[:num_model_rgs]), \
+        print('ressource grid packets do not match the BWP_extractor model!')
+    delta_samples = np.diff(received_rgs['timestamp'].astype(np.int64))
+    corr_factor = 2 ** (NFFT - 8)
+    aligned = np.isin(delta_samples, [274 * corr_factor, 276 * corr_factor])  # depending on cp1 or cp2
+    if expect_exact_timing:
+        assert np.all(aligned), print('Error: symbol timestamps don\'t align!')
+    else:
+        for delta in delta_samples[~aligned]:
+            print(f'timing deviation: delta_samples = {delta}')
 
     # verify channel_estimator and demap
     # try to decode PBCH
@@ -3,7 +3,7 @@ import argparse
 import sys
 import os
 
-def create_lut_file(NFFT, CP_LEN, CP_ADVANCE, OUT_DW, path):
+def create_lut(NFFT, CP_LEN, CP_ADVANCE, OUT_DW):
     FFT_demod_taps = np.empty(2 ** NFFT, int)
     angle_step = 2 * np.pi * (CP_LEN - CP_ADVANCE) / (2 ** NFFT)
     const_angle = np.pi * (CP_LEN - CP_ADVANCE)
@@ -12,6 +12,10 @@ def create_lut_file(NFFT, CP_LEN, CP_ADVANCE, OUT_DW, path):
         tmp = int((np.sin(angle_step * i + const_angle) * (2 ** (OUT_DW // 2 - 1) - 1))) & (2 ** (OUT_DW // 2) - 1)
         # print(f'{FFT_demod_taps[i]} = {np.cos(angle_step * i + np.pi * (CP_LEN - CP_ADVANCE))}')
         FFT_demod_taps[i] |= tmp << (OUT_DW // 2)
+    return FFT_demod_taps
+
+def create_lut_file(NFFT, CP_LEN, CP_ADVANCE, OUT_DW, path):
+    FFT_demod_taps = create_lut(NFFT, CP_LEN, CP_ADVANCE, OUT_DW)
     filename = f'FFT_demod_taps_{int(NFFT)}_{int(CP_LEN)}_{int(CP_ADVANCE)}_{int(OUT_DW)}.hex'
     if not path == '':
         os.makedirs(path, exist_ok=True)
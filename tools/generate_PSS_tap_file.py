@@ -4,7 +4,8 @@ import sys
 import os
 import py3gpp
 
-def create_tap_file(PSS_LEN, TAP_DW, N_id_2, path):
+def create_taps(PSS_LEN, TAP_DW, N_id_2):
+    """PSS taps as packed {im, re} words"""
     PSS = np.zeros(PSS_LEN, 'complex')
     PSS[0:-1] = py3gpp.nrPSS(N_id_2)
     taps = np.fft.ifft(np.fft.fftshift(PSS))
@@ -15,6 +16,10 @@ def create_tap_file(PSS_LEN, TAP_DW, N_id_2, path):
     for i in range(len(taps)):
         PSS_taps[i] = ((int(np.imag(taps[i])) & (2 ** (TAP_DW // 2) - 1)) << (TAP_DW // 2)) \
                                 + (int(np.real(taps[i])) & (2 ** (TAP_DW // 2) - 1))
+    return PSS_taps
+
+def create_tap_file(PSS_LEN, TAP_DW, N_id_2, path):
+    PSS_taps = create_taps(PSS_LEN, TAP_DW, N_id_2)
     filename = f'PSS_taps_{int(N_id_2)}.hex'
     np.savetxt(os.path.join(path, filename), PSS_taps.T, fmt = '%x', delimiter = ' ')
 
@@ -0,0 +1,214 @@
+import numpy as np
+import scipy
+import argparse
+import multiprocessing
+import importlib.util
+import itertools
+import json
+import csv
+import glob
+import sys
+import os
+import py3gpp
+import sigmf
+
+tools_dir = os.path.abspath(os.path.dirname(__file__))
+model_dir = os.path.abspath(os.path.join(tools_dir, '..', 'model'))
+tests_dir = os.path.abspath(os.path.join(tools_dir, '..', 'tests'))
+
+if '_model__loader' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('_model__loader', os.path.join(model_dir, '_loader.py'))
+    sys.modules['_model__loader'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['_model__loader'])
+load_model = sys.modules['_model__loader'].load_model
+
+spec = importlib.util.spec_from_file_location('generate_PSS_tap_file', os.path.join(tools_dir, 'generate_PSS_tap_file.py'))
+generate_PSS_tap_file = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(generate_PSS_tap_file)
+
+NUM_N_ID_2 = 3
+
+def create_PSS_LOCAL(PSS_LEN, TAP_DW, N_id_2):
+    """PSS_LOCAL parameter with the same taps as generate_PSS_tap_file and the testbenches"""
+    taps = generate_PSS_tap_file.create_taps(PSS_LEN, TAP_DW, N_id_2)
+    PSS_LOCAL = 0
+    for i in range(len(taps)):
+        PSS_LOCAL += int(taps[i]) << (TAP_DW * i)
+    return PSS_LOCAL
+
+def load_recording(FILE, fs_out = 1920000):
+    """waveform of a recording decimated to fs_out, normalized to a maximum component of 1"""
+    handle = sigmf.sigmffile.fromfile(FILE)
+    fs = handle.get_global_field(sigmf.SigMFFile.SAMPLE_RATE_KEY)
+    waveform = handle.read_samples()
+    waveform /= max(waveform.real.max(), waveform.imag.max())
+    dec_factor = int(fs / fs_out)
+    if dec_factor > 1:
+        waveform = scipy.signal.decimate(waveform, dec_factor, ftype='fir')
+    return waveform / max(waveform.real.max(), waveform.imag.max())
+
+def quantize(waveform, IN_DW):
+    """integer samples like in the testbenches"""
+    waveform = waveform * (2 ** (IN_DW // 2 - 1) - 1)
+    return waveform.real.astype(int) + 1j*waveform.imag.astype(int)
+
+def find_reference_peaks(waveform, PSS_LEN, truth_level):
+    """
+    PSS positions and N_id_2 of a recording
+
+    The reference is a floating point correlation of the waveform with the unquantized PSS, so it does not depend
+    on the fixed point correlator that is evaluated. Sample n of the correlation uses the same window as sample n
+    of the correlator output. Peaks above truth_level * highest peak are counted as PSS.
+    """
+    corr = np.zeros((NUM_N_ID_2, len(waveform)))
+    for N_id_2 in range(NUM_N_ID_2):
+        PSS = np.zeros(PSS_LEN, 'complex')
+        PSS[0:-1] = py3gpp.nrPSS(N_id_2)
+        taps = np.fft.ifft(np.fft.fftshift(PSS))
+        corr[N_id_2] = np.abs(scipy.signal.fftconvolve(waveform, taps)[:len(waveform)])
+    best = corr.max(axis = 0)
+    positions, _ = scipy.signal.find_peaks(best, height = truth_level * best.max(), distance = PSS_LEN)
+    return positions, np.argmax(corr[:, positions], axis = 0)
+
+def evaluate(peak_detected, ref_pos, ref_N_id_2, tolerance):
+    """
+    returns the number of detected reference peaks and the number of false alarms
+
+    A detection matches a reference peak if it is on the right N_id_2 and at most tolerance samples away,
+    all other detections are false alarms.
+    """
+    detected = np.zeros(len(ref_pos), bool)
+    false_alarms = 0
+    for N_id_2 in range(peak_detected.shape[0]):
+        events = np.flatnonzero(peak_detected[N_id_2])
+        refs = ref_pos[ref_N_id_2 == N_id_2]
+        first = np.searchsorted(events, refs - tolerance)
+        last = np.searchsorted(events, refs + tolerance, side = 'right')
+        detected[ref_N_id_2 == N_id_2] = last > first
+        false_alarms += len(events) - np.sum(last - first)
+    return int(np.sum(detected)), int(false_alarms)
+
+def correlate_recording(job):
+    """one correlator pass and the reference peaks of a recording"""
+    FILE, config = job
+    PSS_correlator_bank = load_model('PSS_correlator_bank')
+
+    PSS_LOCAL = [create_PSS_LOCAL(config['PSS_LEN'], config['TAP_DW'], N_id_2) for N_id_2 in range(NUM_N_ID_2)]
+    bank = PSS_correlator_bank.Model(config['IN_DW'], config['OUT_DW'], config['TAP_DW'], config['PSS_LEN'], PSS_LOCAL, config['ALGO'])
+    waveform = load_recording(FILE)
+    scores, _ = bank.correlate(quantize(waveform, config['IN_DW']))
+    ref_pos, ref_N_id_2 = find_reference_peaks(waveform, config['PSS_LEN'], config['truth_level'])
+    return scores, ref_pos, ref_N_id_2
+
+# correlator scores and reference peaks of all recordings, set in every worker by _init_worker
+_recordings = None
+
+def _init_worker(recordings):
+    global _recordings
+    _recordings = recordings
+
+def sweep_point(job):
+    """the peak detector for one recording and one point of the grid"""
+    recording, WINDOW_LEN, detection_shift, noise_limit, config = job
+    peak_detector = load_model('peak_detector')
+    scores, ref_pos, ref_N_id_2 = _recordings[recording]
+
+    detector = peak_detector.Model(config['OUT_DW'], WINDOW_LEN)
+    peak_detected = np.array([detector.detect(scores[N_id_2], noise_limit, detection_shift)[0] for N_id_2 in range(NUM_N_ID_2)])
+    detections, false_alarms = evaluate(peak_detected, ref_pos, ref_N_id_2, config['tolerance'])
+    return {
+        'detection_shift': detection_shift,
+        'noise_limit': noise_limit,
+        'WINDOW_LEN': WINDOW_LEN,
+        'detections': detections,
+        'references': len(ref_pos),
+        'false_alarms': false_alarms,
+        'samples': scores.shape[1]
+    }
+
+def combine(recordings):
+    """sums up the results of all recordings for every point of the grid"""
+    combined = {}
+    for recording in recordings:
+        for result in recording['results']:
+            key = (result['detection_shift'], result['noise_limit'], result['WINDOW_LEN'])
+            total = combined.setdefault(key, dict(result, detections = 0, references = 0, false_alarms = 0, samples = 0))
+            for field in ('detections', 'references', 'false_alarms', 'samples'):
+                total[field] += result[field]
+    for total in combined.values():
+        total['detection_rate'] = total['detections'] / total['references'] if total['references'] else 0.0
+        # false alarms per sample and N_id_2 branch, every sample is checked by all branches
+        total['false_alarm_rate'] = total['false_alarms'] / (NUM_N_ID_2 * total['samples']) if total['samples'] else 0.0
+    # ROC order
+    return sorted(combined.values(), key = lambda total: (total['false_alarm_rate'], total['detection_rate']))
+
+def _int_list(arg):
+    return [int(val, 0) for val in arg.split(',')]
+
+def main(args):
+    print(sys.argv)
+
+    parser = argparse.ArgumentParser(description='Sweeps the peak detector settings over recordings with the PSS correlator and peak detector models')
+    parser.add_argument('--files', metavar='files', nargs='*', required=False, default = None, help='sigmf-data files, default are all recordings in tests/')
+    parser.add_argument('--detection_shift', metavar='detection_shift', required=False, default = '0,1,2,3,4,5,6', help='comma separated list of detection shifts')
+    parser.add_argument('--noise_limit', metavar='noise_limit', required=False, default = '0', help='comma separated list of noise limits')
+    parser.add_argument('--WINDOW_LEN', metavar='WINDOW_LEN', required=False, default = '8', help='comma separated list of peak detector window lengths')
+    parser.add_argument('--IN_DW', metavar='IN_DW', required=False, default = 32, help='IN_DW of the correlator')
+    parser.add_argument('--OUT_DW', metavar='OUT_DW', required=False, default = 32, help='OUT_DW of the correlator')
+    parser.add_argument('--TAP_DW', metavar='TAP_DW', required=False, default = 32, help='TAP_DW of the correlator')
+    parser.add_argument('--PSS_LEN', metavar='PSS_LEN', required=False, default = 128, help='PSS_LEN of the correlator')
+    parser.add_argument('--ALGO', metavar='ALGO', required=False, default = 0, help='ALGO of the correlator')
+    parser.add_argument('--truth_level', metavar='truth_level', required=False, default = 0.5, help='peaks of the floating point PSS correlation above this fraction of the highest peak are counted as PSS')
+    parser.add_argument('--tolerance', metavar='tolerance', required=False, default = 2, help='max distance in samples between a detection and a PSS')
+    parser.add_argument('--processes', metavar='processes', required=False, default = None, help='number of worker processes, default is the number of cpus')
+    parser.add_argument('--json', metavar='json', required=False, default = 'peak_detector_sweep.json', help='output json file')
+    parser.add_argument('--csv', metavar='csv', required=False, default = 'peak_detector_sweep.csv', help='output csv file')
+    args = parser.parse_args(args)
+
+    files = args.files
+    if not files:
+        files = sorted(glob.glob(os.path.join(tests_dir, '*.sigmf-data')))
+    if not files:
+        print(f'no recordings found in {tests_dir}')
+        return
+
+    config = {
+        'IN_DW': int(args.IN_DW),
+        'OUT_DW': int(args.OUT_DW),
+        'TAP_DW': int(args.TAP_DW),
+        'PSS_LEN': int(args.PSS_LEN),
+        'ALGO': int(args.ALGO),
+        'detection_shift': _int_list(args.detection_shift),
+        'noise_limit': _int_list(args.noise_limit),
+        'WINDOW_LEN': _int_list(args.WINDOW_LEN),
+        'truth_level': float(args.truth_level),
+        'tolerance': int(args.tolerance)
+    }
+    processes = int(args.processes) if args.processes is not None else None
+    with multiprocessing.Pool(processes) as pool:
+        correlated = pool.map(correlate_recording, [(FILE, config) for FILE in files])
+    grid = list(itertools.product(config['WINDOW_LEN'], config['detection_shift'], config['noise_limit']))
+    jobs = [(recording, *point, config) for recording in range(len(files)) for point in grid]
+    # the peak detector runs for every (recording, grid point) pair, so that a single recording uses all workers
+    with multiprocessing.Pool(processes, initializer = _init_worker, initargs = (correlated,)) as pool:
+        results = pool.map(sweep_point, jobs)
+    recordings = []
+    for recording, (FILE, (_, ref_pos, ref_N_id_2)) in enumerate(zip(files, correlated)):
+        recordings.append({
+            'file': os.path.basename(FILE),
+            'reference_peaks': ref_pos.tolist(),
+            'reference_N_id_2': ref_N_id_2.tolist(),
+            'results': results[recording * len(grid):][:len(grid)]
+        })
+    combined = combine(recordings)
+
+    with open(args.json, 'w') as f:
+        json.dump({'config': config, 'recordings': recordings, 'combined': combined}, f, indent = 2)
+    with open(args.csv, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = list(combined[0].keys()))
+        writer.writeheader()
+        writer.writerows(combined)
+    print(f'wrote {len(combined)} settings for {len(files)} recordings to {args.json} and {args.csv}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])